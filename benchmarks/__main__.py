@@ -0,0 +1,69 @@
+"""
+Runs the benchmarks and compares their results with a baseline.
+
+    python -m benchmarks run --rows 1000 100000 --save main
+    python -m benchmarks run --save current
+    python -m benchmarks compare main current --threshold 0.1
+
+Baselines are stored in ``benchmarks/baselines/<name>.json``. They only compare well with runs on the same machine.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from benchmarks import auth, email_templates, metrics, rate_limit, repository, schemas, suite
+
+SUITES = {
+    "auth": auth.cases,
+    "repository": repository.cases,
+    "schemas": schemas.cases,
+    "email_templates": email_templates.cases,
+    "rate_limit": rate_limit.cases,
+    "metrics": metrics.cases,
+}
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the benchmarks")
+    run.add_argument("suites", nargs="*", metavar="SUITE",
+                     help=f"the suites to run, all of them by default: {', '.join(SUITES)}")
+    run.add_argument("-k", "--filter", help="only run the cases whose name contains this")
+    run.add_argument("--rows", type=int, nargs="+", default=[1000, 100_000, 1_000_000],
+                     help="the contact counts the repository is timed at")
+    run.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'contacts_bench.db')}",
+                     help="a synchronous database URL, seeded on the first run and reused afterwards")
+    run.add_argument("--repeat", type=int, default=5, help="the number of timed loops per case")
+    run.add_argument("--min-time", type=float, default=0.2, help="the minimum duration of a loop, in seconds")
+    run.add_argument("--save", metavar="NAME", help="store the results as a baseline")
+
+    compare = commands.add_parser("compare", help="compare two saved results")
+    compare.add_argument("baseline", help="the name or path of the baseline")
+    compare.add_argument("current", help="the name or path of the new results")
+    compare.add_argument("--threshold", type=float, default=0.1, help="the slowdown tolerated, e.g. 0.1 for 10%%")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if unknown := set(args.suites) - set(SUITES):
+            parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+        options = {"rows": args.rows, "database_url": args.database_url}
+        suites = [SUITES[name] for name in args.suites or SUITES]
+        report = asyncio.run(suite.run(suites, options, args.filter, args.repeat, args.min_time))
+        if args.save:
+            print(f"Saved to {suite.save(report, args.save)}")
+        return 0
+
+    regressions = suite.compare(suite.load(args.baseline), suite.load(args.current), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
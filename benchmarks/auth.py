@@ -0,0 +1,56 @@
+"""
+Token creation and decoding, the authenticated user lookup and password hashing.
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+from jose import jwt
+
+from src.conf.config import settings
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import user_cache
+
+
+class CachedUserRedis:
+    """
+    Redis stand-in that always holds the benchmark user, so ``get_current_user`` never reaches the database.
+    """
+
+    def __init__(self, value: str):
+        self.value = value
+
+    async def get(self, key):
+        return self.value
+
+    async def set(self, key, value, ex=None):
+        pass
+
+
+async def cases(options: dict):
+    user = User(id=1, username="bench", email="bench@example.com", avatar="", confirmed=True,
+                created_at=datetime(2024, 1, 1))
+    token = await auth_service.create_access_token({"sub": user.email})
+    password_hash = await auth_service.get_password_hash("password")
+
+    async def create_access_token():
+        await auth_service.create_access_token({"sub": user.email})
+
+    def decode_token():
+        jwt.decode(token, auth_service.SECRET_KEY, algorithms=[auth_service.ALGHORITM])
+
+    async def get_current_user():
+        await auth_service.get_current_user(token, None)
+
+    async def get_password_hash():
+        await auth_service.get_password_hash("password")
+
+    async def verify_password():
+        await auth_service.verify_password("password", password_hash)
+
+    yield "auth.create_access_token", create_access_token
+    yield "auth.decode_token", decode_token
+    with patch.object(user_cache, "redis", CachedUserRedis(user_cache.dumps(user))):
+        yield "auth.get_current_user (cached user)", get_current_user
+    yield f"auth.get_password_hash (rounds={settings.bcrypt_rounds})", get_password_hash
+    yield f"auth.verify_password (rounds={settings.bcrypt_rounds})", verify_password
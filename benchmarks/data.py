@@ -0,0 +1,115 @@
+"""
+Synthetic users and contacts for benchmarks and load tests.
+"""
+import random
+from datetime import date, timedelta
+from typing import Iterator
+
+from sqlalchemy import Connection, insert, select, func, text
+
+from src.database.models import Base, Contact, User
+
+FIRST_NAMES = (
+    "Andrii", "Oleksandr", "Dmytro", "Maksym", "Ivan", "Mykola", "Serhii", "Volodymyr", "Yurii", "Taras",
+    "Bohdan", "Roman", "Vasyl", "Petro", "Oleh", "Artem", "Denys", "Pavlo", "Viktor", "Stepan",
+    "Olena", "Iryna", "Natalia", "Oksana", "Tetiana", "Kateryna", "Yulia", "Svitlana", "Mariia", "Anna",
+    "Sofiia", "Daryna", "Viktoriia", "Halyna", "Liudmyla", "Khrystyna", "Alina", "Valentyna", "Zoriana", "Lesia",
+    "James", "John", "Robert", "Michael", "William", "David", "Richard", "Joseph", "Thomas", "Charles",
+    "Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Barbara", "Susan", "Jessica", "Sarah", "Karen",
+    "Lukas", "Jonas", "Felix", "Emil", "Leon", "Mia", "Emma", "Hanna", "Lea", "Lena",
+    "Mateusz", "Jakub", "Kacper", "Zofia", "Maja", "Lucas", "Hugo", "Louis", "Chloe", "Ines",
+)
+SURNAMES = (
+    "Melnyk", "Shevchenko", "Boiko", "Kovalenko", "Bondarenko", "Tkachenko", "Kovalchuk", "Kravchenko",
+    "Oliinyk", "Shevchuk", "Koval", "Polishchuk", "Bondar", "Tkachuk", "Moroz", "Marchenko", "Lysenko",
+    "Rudenko", "Savchenko", "Petrenko", "Klymenko", "Pavlenko", "Savchuk", "Kuzmenko", "Stoian", "Bugay",
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Wilson", "Anderson", "Taylor", "Thomas", "Moore", "Jackson", "Martin", "Lee", "Thompson", "White",
+    "Muller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Nowak", "Kowalski",
+    "Wisniewski", "Wojcik", "Dubois", "Durand", "Lefebvre", "Moreau", "Laurent", "Simon", "Michel", "Leroy",
+)
+EMAIL_DOMAINS = ("gmail.com", "ukr.net", "outlook.com", "yahoo.com", "example.com", "i.ua", "meta.ua")
+BIRTHDAY_START = date(1950, 1, 1)
+BIRTHDAY_DAYS = (date(2010, 12, 31) - BIRTHDAY_START).days
+PASSWORD = "password"
+
+
+def generate_contacts(user_id: int, count: int, seed: int = 0, start: int = 0) -> Iterator[dict]:
+    """
+    Generates distinct contacts of a user with realistic names and uniformly spread birthdays.
+
+    :param user_id: The ID of the owner.
+    :type user_id: int
+    :param count: The number of contacts.
+    :type count: int
+    :param seed: Makes the output reproducible.
+    :type seed: int
+    :param start: The number of the first contact, to add to a user's contacts without clashes.
+    :type start: int
+    :return: The rows of the contacts table.
+    :rtype: Iterator[dict]
+    """
+    rng = random.Random(f"{seed}:{user_id}:{start}")
+    for number in range(start, start + count):
+        first_name, surname = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+        yield {
+            "first_name": first_name,
+            "surname": surname,
+            "email": f"{first_name}.{surname}.{number}@{rng.choice(EMAIL_DOMAINS)}".lower(),
+            "phone_number": f"380{number:09d}",
+            "birthday": BIRTHDAY_START + timedelta(days=rng.randrange(BIRTHDAY_DAYS)),
+            "user_id": user_id,
+        }
+
+
+def create_tables(connection: Connection):
+    """
+    Creates the tables that do not exist yet, with the ``pg_trgm`` extension on PostgreSQL.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(connection)
+
+
+def seed_users(connection: Connection, count: int, password_hash: str, start: int = 0) -> list[int]:
+    """
+    Inserts confirmed users ``user<N>@example.com`` that all share one password hash.
+
+    :param connection: The database connection.
+    :type connection: Connection
+    :param count: The number of users.
+    :type count: int
+    :param password_hash: The hash of :data:`PASSWORD`, made once since hashing is slow on purpose.
+    :type password_hash: str
+    :param start: The number of the first user.
+    :type start: int
+    :return: The IDs of the users.
+    :rtype: list[int]
+    """
+    emails = [f"user{number}@example.com" for number in range(start, start + count)]
+    connection.execute(insert(User), [
+        {"username": email.split("@")[0], "email": email, "password": password_hash, "confirmed": True}
+        for email in emails
+    ])
+    return list(connection.scalars(select(User.id).filter(User.email.in_(emails)).order_by(User.id)))
+
+
+def seed_contacts(connection: Connection, user_id: int, count: int, seed: int = 0, batch_size: int = 10000):
+    """
+    Adds generated contacts to a user in batches.
+
+    :param connection: The database connection.
+    :type connection: Connection
+    :param user_id: The ID of the owner.
+    :type user_id: int
+    :param count: The number of contacts to add.
+    :type count: int
+    :param seed: Makes the contacts reproducible.
+    :type seed: int
+    :param batch_size: The number of rows per insert.
+    :type batch_size: int
+    """
+    start = connection.scalar(select(func.count(Contact.id)).filter(Contact.user_id == user_id))
+    rows = generate_contacts(user_id, count, seed, start)
+    while batch := [row for _, row in zip(range(batch_size), rows)]:
+        connection.execute(insert(Contact), batch)
@@ -0,0 +1,28 @@
+"""
+Rendering of personalized emails.
+"""
+from itertools import count
+
+from src.services.email import conf, templates, build_email
+
+
+async def cases(options: dict):
+    numbers = count()
+
+    def per_message_environment():
+        # What fastapi_mail did for every message: a new environment that loads and compiles the template again
+        conf.template_engine().get_template("email_template.html").render(
+            username=f"user{next(numbers)}", host="http://localhost:8000/", token="token")
+
+    def shared_environment():
+        templates.get_template("email_template.html").render(
+            username=f"user{next(numbers)}", host="http://localhost:8000/", token="token")
+
+    def full_message():
+        number = next(numbers)
+        build_email("confirm_email", f"user{number}@example.com",
+                    {"username": f"user{number}", "host": "http://localhost:8000/"}).as_bytes()
+
+    yield "email.render (environment per message)", per_message_environment
+    yield "email.render (shared environment)", shared_environment
+    yield "email.build_email", full_message
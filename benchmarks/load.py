@@ -0,0 +1,359 @@
+"""
+Seeds a database with synthetic users and contacts, then drives mixed traffic through the routes of ``main.app``.
+
+    python -m benchmarks.load seed --users 100 --contacts 10000
+    python -m benchmarks.load run --users 100 --concurrency 50 --duration 60
+    python -m benchmarks.load run --mix list=5,search=2,signup=1 --mail local --output load.json
+
+By default the requests go through the application in process, with Redis replaced by an in-memory stand-in,
+the rate limits lifted and the queued emails delivered to a sender that only counts them. The load generator
+shares the CPU with the application then, so compare runs with each other rather than with production.
+``--url`` sends the requests to a running server instead, whose own settings apply.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import date, timedelta
+from email.message import Message
+from itertools import count
+from unittest.mock import patch
+
+import httpx
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+
+from src.database.db import get_async_url, get_db
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import user_cache, contacts_cache
+from src.services.mailer import MailSender
+from src.services.outbox import run_worker
+from src.services.rate_limit import rate_limits
+
+from benchmarks.data import EMAIL_DOMAINS, FIRST_NAMES, PASSWORD, SURNAMES, create_tables, seed_contacts, seed_users
+from tests.fakes import MemoryRedis
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'contacts_load.db')}"
+DEFAULT_MIX = {"login": 1, "list": 30, "search": 20, "birthday": 10, "create": 5, "update": 5, "delete": 4}
+OPERATIONS = (*DEFAULT_MIX, "signup")
+
+
+class LocalMailSender(MailSender):
+    """
+    Sender that accepts every email without connecting anywhere, so the outbox worker can run without SMTP.
+    """
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_many(self, messages: list[Message]) -> list[Exception | None]:
+        self.sent += len(messages)
+        return [None] * len(messages)
+
+    async def close(self):
+        pass
+
+
+def seed(database_url: str, users: int, contacts: int):
+    """
+    Adds confirmed users ``user<N>@example.com`` with ``contacts`` contacts each, after the ones seeded before.
+
+    :param database_url: The synchronous database URL.
+    :type database_url: str
+    :param users: The number of users to add.
+    :type users: int
+    :param contacts: The number of contacts per user.
+    :type contacts: int
+    """
+    password_hash = asyncio.run(auth_service.get_password_hash(PASSWORD))
+    engine = create_engine(database_url)
+    with engine.begin() as connection:
+        create_tables(connection)
+        start = connection.scalar(select(func.count(User.id)).filter(User.email.like("user%@example.com")))
+        user_ids = seed_users(connection, users, password_hash, start)
+    started = time.perf_counter()
+    for user_id in user_ids:
+        with engine.begin() as connection:
+            seed_contacts(connection, user_id, contacts)
+        print(f"\rSeeded user {user_id}", end="", flush=True)
+    engine.dispose()
+    print(f"\nSeeded {users} users and {users * contacts} contacts in {time.perf_counter() - started:.1f} s")
+
+
+class Stats:
+    """
+    Latencies and status codes per operation.
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, operation: str, status_code: int, seconds: float):
+        self.latencies[operation].append(seconds)
+        self.statuses[operation][status_code] += 1
+
+    def report(self, duration: float) -> dict:
+        """
+        Summarizes the recorded requests.
+
+        :param duration: The duration of the run, in seconds.
+        :type duration: float
+        :return: The requests, errors, throughput and p50/p95/p99/max latency in milliseconds of every operation.
+        :rtype: dict
+        """
+        report = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            # The 101 cut points make index n the n-th percentile; quantiles needs two values at least
+            cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+            report[operation] = {
+                "requests": len(latencies),
+                "errors": sum(number for code, number in statuses.items() if code >= 400),
+                "statuses": {str(code): number for code, number in sorted(statuses.items())},
+                "throughput": len(latencies) / duration,
+                "p50_ms": cuts[49] * 1e3,
+                "p95_ms": cuts[94] * 1e3,
+                "p99_ms": cuts[98] * 1e3,
+                "max_ms": max(latencies) * 1e3,
+            }
+        return report
+
+
+class VirtualUser:
+    """
+    One seeded user logged in once, who keeps track of the contacts it has seen and created.
+    """
+
+    phones = count()
+    run_id = time.time_ns() // 10 ** 9 % 10 ** 6
+
+    def __init__(self, client: httpx.AsyncClient, email: str, stats: Stats, rng: random.Random):
+        self.client = client
+        self.email = email
+        self.stats = stats
+        self.rng = rng
+        self.headers = {}
+        self.seen = {}
+        self.created = []
+
+    async def request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        self.stats.record(operation, response.status_code, time.perf_counter() - started)
+        return response
+
+    def new_contact(self) -> dict:
+        first_name, surname = self.rng.choice(FIRST_NAMES), self.rng.choice(SURNAMES)
+        number = next(self.phones)
+        birthday = date(self.rng.randrange(1950, 2010), 1, 1) + timedelta(days=self.rng.randrange(365))
+        return {
+            "first_name": first_name,
+            "surname": surname,
+            "email": f"{first_name}.{surname}.load{self.run_id}.{number}@{self.rng.choice(EMAIL_DOMAINS)}".lower(),
+            "phone_number": f"555{self.run_id:06d}{number:07d}",
+            "birthday": birthday.isoformat(),
+        }
+
+    async def login(self):
+        response = await self.request("login", "POST", "/api/auth/login",
+                                      data={"username": self.email, "password": PASSWORD})
+        if response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def signup(self):
+        number = next(self.phones)
+        await self.request("signup", "POST", "/api/auth/signup", json={
+            "username": f"load{self.run_id}{number}"[:16],
+            "email": f"load{self.run_id}.{number}@example.com",
+            "password": PASSWORD,
+        })
+
+    async def list(self):
+        response = await self.request("list", "GET", "/api/contacts/",
+                                      params={"limit": 20, "skip": self.rng.randrange(0, 1000, 20)})
+        if response.status_code == 200:
+            self.seen.update((contact["id"], contact) for contact in response.json())
+
+    async def search(self):
+        query = self.rng.choice(self.rng.choice((FIRST_NAMES, SURNAMES)))[:self.rng.randint(3, 6)]
+        await self.request("search", "GET", "/api/contacts/search", params={"q": query})
+
+    async def birthday(self):
+        await self.request("birthday", "GET", "/api/contacts/birthday")
+
+    async def create(self):
+        response = await self.request("create", "POST", "/api/contacts/", json=self.new_contact())
+        if response.status_code == 201:
+            contact = response.json()
+            self.created.append(contact["id"])
+            self.seen[contact["id"]] = contact
+
+    async def update(self):
+        if not self.seen:
+            return await self.list()
+        contact = self.seen[self.rng.choice(list(self.seen))]
+        body = {**contact, "first_name": self.rng.choice(FIRST_NAMES)}
+        del body["id"]
+        await self.request("update", "PUT", f"/api/contacts/{contact['id']}", json=body)
+
+    async def delete(self):
+        # Only the contacts created during the run are deleted, so the seeded data stays the same between runs
+        if not self.created:
+            return await self.create()
+        contact_id = self.created.pop(self.rng.randrange(len(self.created)))
+        self.seen.pop(contact_id, None)
+        await self.request("delete", "DELETE", f"/api/contacts/{contact_id}")
+
+
+async def drive(client: httpx.AsyncClient, emails: list[str], mix: dict[str, int], concurrency: int,
+                duration: float, seed: int) -> tuple[Stats, float]:
+    """
+    Runs ``concurrency`` clients, each acting as a random seeded user, until ``duration`` seconds are over.
+
+    :return: The recorded requests and the actual duration of the run.
+    :rtype: tuple[Stats, float]
+    """
+    stats = Stats()
+    operations, weights = zip(*((operation, weight) for operation, weight in mix.items() if weight > 0))
+    deadline = time.perf_counter() + duration
+
+    async def worker(number: int):
+        rng = random.Random(f"{seed}:{number}")
+        user = VirtualUser(client, rng.choice(emails), stats, rng)
+        await user.login()
+        while time.perf_counter() < deadline:
+            await getattr(user, rng.choices(operations, weights)[0])()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    return stats, time.perf_counter() - started
+
+
+@asynccontextmanager
+async def in_process(engine: AsyncEngine, redis: str, rate_limit: str, mail: str):
+    """
+    Points ``main.app`` at the load-test database and replaces its Redis, rate limits and mail as asked.
+
+    :return: A client that calls the application without a network.
+    :rtype: httpx.AsyncClient
+    """
+    from main import app
+
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_load_db():
+        async with session_factory() as db:
+            yield db
+
+    async with AsyncExitStack() as stack:
+        app.dependency_overrides[get_db] = get_load_db
+        stack.callback(app.dependency_overrides.pop, get_db, None)
+        if redis == "local":
+            for component in (user_cache, contacts_cache, rate_limits):
+                stack.enter_context(patch.object(component, "redis", MemoryRedis()))
+        if rate_limit == "off":
+            stack.enter_context(patch.dict(rate_limits.limits, {kind: (10 ** 9, 1) for kind in rate_limits.limits}))
+        if mail != "off":
+            sender = LocalMailSender() if mail == "local" else None
+            worker = asyncio.create_task(run_worker(session_factory, *([sender] if sender else [])))
+            stack.callback(worker.cancel)
+        transport = httpx.ASGITransport(app=app)
+        yield await stack.enter_async_context(httpx.AsyncClient(transport=transport, base_url="http://loadtest"))
+
+
+async def load(args: argparse.Namespace) -> dict:
+    engine = create_async_engine(get_async_url(args.database_url), pool_size=args.concurrency)
+    async with engine.connect() as connection:
+        emails = list(await connection.scalars(select(User.email).filter(
+            User.email.like("user%@example.com"), User.confirmed).order_by(User.id).limit(args.users)))
+    if not emails:
+        sys.exit(f"No seeded users in {args.database_url}, run `python -m benchmarks.load seed` first")
+    try:
+        if args.url:
+            async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+                stats, duration = await drive(client, emails, args.mix, args.concurrency, args.duration, args.seed)
+        else:
+            async with in_process(engine, args.redis, args.rate_limit, args.mail) as client:
+                stats, duration = await drive(client, emails, args.mix, args.concurrency, args.duration, args.seed)
+    finally:
+        await engine.dispose()
+    return {
+        "meta": {"users": len(emails), "concurrency": args.concurrency, "duration": duration, "mix": args.mix,
+                 "target": args.url or "in process", "redis": args.redis, "rate_limit": args.rate_limit},
+        "results": stats.report(duration),
+    }
+
+
+def print_report(report: dict):
+    print(f"{'operation':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    results = report["results"]
+    for operation, result in results.items():
+        print(f"{operation:<10} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>8.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['max_ms']:>9.1f}")
+    total = sum(result["requests"] for result in results.values())
+    print(f"{'total':<10} {total:>9} {sum(result['errors'] for result in results.values()):>7} "
+          f"{total / report['meta']['duration']:>8.1f}")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {operation: 0 for operation in OPERATIONS}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        if operation not in mix or not weight.isdigit():
+            raise argparse.ArgumentTypeError(f"expected operation=weight with operations {', '.join(OPERATIONS)}")
+        mix[operation] = int(weight)
+    return mix
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL, help="a synchronous database URL")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="add confirmed users with contacts")
+    seed_parser.add_argument("--users", type=int, default=100, help="the number of users to add")
+    seed_parser.add_argument("--contacts", type=int, default=10000, help="the number of contacts per user")
+
+    run = commands.add_parser("run", help="drive mixed traffic and report the latency per operation")
+    run.add_argument("--users", type=int, default=100, help="the number of seeded users to act as")
+    run.add_argument("--concurrency", type=int, default=20, help="the number of clients sending requests")
+    run.add_argument("--duration", type=float, default=30, help="the duration of the run, in seconds")
+    run.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                     help="the weights of the operations, e.g. list=5,search=2 (default: %(default)s)")
+    run.add_argument("--url", help="the base URL of a running server, instead of calling the application in process")
+    run.add_argument("--redis", choices=("local", "server"), default="local",
+                     help="an in-memory stand-in or the Redis server from the settings")
+    run.add_argument("--rate-limit", choices=("off", "on"), default="off",
+                     help="lift the rate limits or keep the ones from the settings")
+    run.add_argument("--mail", choices=("local", "smtp", "off"), default="local",
+                     help="deliver queued emails to a counting stand-in, to the SMTP server from the settings, "
+                          "or leave them in the outbox")
+    run.add_argument("--seed", type=int, default=0, help="makes the sequence of operations reproducible")
+    run.add_argument("--output", help="also write the report to this JSON file")
+
+    args = parser.parse_args(argv)
+    if args.command == "seed":
+        seed(args.database_url, args.users, args.contacts)
+        return 0
+
+    report = asyncio.run(load(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Overhead of the metrics middleware and the dependency timing on every request.
+"""
+from src.services.metrics import RequestMetrics, MetricsMiddleware
+
+
+class Route:
+    path = "/api/contacts/{contact_id}"
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def cases(options: dict):
+    metrics = RequestMetrics()
+    middleware = MetricsMiddleware(endpoint, metrics)
+
+    async def dependency():
+        return None
+
+    timed_dependency = metrics.timed("dependency")(dependency)
+
+    async def bare_request():
+        await endpoint({"type": "http", "method": "GET", "path": "/api/contacts/1"}, receive, send)
+
+    async def metered_request():
+        await middleware({"type": "http", "method": "GET", "path": "/api/contacts/1"}, receive, send)
+
+    yield "metrics.request (no middleware)", bare_request
+    yield "metrics.request (middleware)", metered_request
+    yield "metrics.dependency", dependency
+    yield "metrics.dependency (timed)", timed_dependency
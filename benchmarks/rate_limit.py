@@ -0,0 +1,28 @@
+"""
+Latency of the rate limiter on the request path.
+"""
+from itertools import count
+
+from src.services.rate_limit import RateLimitStore
+
+
+class CounterRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def incrby(self, key, amount):
+        self.data[key] = self.data.get(key, 0) + amount
+        return self.data[key]
+
+    async def expire(self, key, seconds):
+        return True
+
+
+async def cases(options: dict):
+    store = RateLimitStore(CounterRedis(), limits={"read": (10 ** 9, 1)}, sync_interval=1, maxsize=10000)
+    numbers = count()
+
+    def hit():
+        store.hit("read", "get_contacts", next(numbers) % 1000)
+
+    yield "rate_limit.hit", hit
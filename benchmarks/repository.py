@@ -0,0 +1,147 @@
+"""
+Every function of the contacts repository against a user with 1k, 100k or 1M contacts.
+"""
+from datetime import date
+from itertools import count
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from src.database.db import get_async_url
+from src.database.models import Contact, User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactModel, ContactFilter
+from src.services.cache import contacts_cache
+
+from benchmarks.data import create_tables, seed_contacts
+
+# A full export of a million rows takes seconds per call, so it stops at this size
+MAX_EXPORT_ROWS = 100_000
+
+
+class VersionRedis:
+    """
+    Redis stand-in for the version bumps of the response cache, so writes do not wait on a connection.
+    """
+
+    async def set(self, key, value, ex=None, nx=False):
+        return None
+
+    async def incr(self, key):
+        return 1
+
+
+def seed(database_url: str, rows: int) -> int:
+    """
+    Creates the user ``bench<rows>@example.com`` with ``rows`` contacts, unless it exists.
+
+    :return: The ID of the user.
+    :rtype: int
+    """
+    engine = create_engine(database_url)
+    email = f"bench{rows}@example.com"
+    with engine.begin() as connection:
+        create_tables(connection)
+        user_id = connection.scalar(select(User.id).filter(User.email == email))
+        if user_id is None:
+            user_id = connection.execute(insert(User).values(
+                username=f"bench{rows}", email=email, password="-", confirmed=True)).inserted_primary_key[0]
+        missing = rows - connection.scalar(select(func.count(Contact.id)).filter(Contact.user_id == user_id))
+        if missing > 0:
+            print(f"Seeding {missing} contacts for {email}...")
+            seed_contacts(connection, user_id, missing)
+    engine.dispose()
+    return user_id
+
+
+async def cases(options: dict):
+    engine = create_async_engine(get_async_url(options["database_url"]))
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    try:
+        with patch.object(contacts_cache, "redis", VersionRedis()):
+            for rows in options["rows"]:
+                async with session_factory() as db:
+                    async for case in rows_cases(rows, seed(options["database_url"], rows), db):
+                        yield case
+    finally:
+        await engine.dispose()
+
+
+async def rows_cases(rows: int, user_id: int, db):
+    user = await db.get(User, user_id)
+    sample = (await db.execute(select(Contact).filter(Contact.user_id == user_id)
+                               .order_by(Contact.id).offset(rows // 2).limit(1))).scalar_one()
+    phones = count(10 ** 8)
+    prefix = f"contacts[{rows}]"
+
+    async def get_contacts():
+        await repository_contacts.get_contacts(20, 0, user, db)
+
+    async def get_contacts_deep_offset():
+        await repository_contacts.get_contacts(20, rows // 2, user, db)
+
+    async def get_contacts_keyset():
+        await repository_contacts.get_contacts(20, 0, user, db, "surname", (sample.surname, sample.id))
+
+    async def query_contacts():
+        filters = ContactFilter(first_name=sample.first_name, birthday_from=date(1980, 1, 1),
+                                birthday_to=date(1990, 1, 1))
+        await repository_contacts.query_contacts(filters, 20, user, db)
+
+    async def get_contact_by_id():
+        await repository_contacts.get_contact_by_id(sample.id, user, db)
+
+    async def get_contact_by_email():
+        await repository_contacts.get_contact_by_email(sample.email, user, db)
+
+    async def get_contact_by_name():
+        await repository_contacts.get_contact_by_name(sample.first_name, user, db)
+
+    async def get_contact_by_surname():
+        await repository_contacts.get_contact_by_surname(sample.surname, user, db)
+
+    async def get_contact_by_phone():
+        await repository_contacts.get_contact_by_phone(sample.phone_number, user, db)
+
+    async def search_contacts():
+        await repository_contacts.search_contacts(sample.surname[:4], user, db)
+
+    async def get_birthday_contact():
+        await repository_contacts.get_birthday_contact(user, db)
+
+    async def get_contacts_version():
+        await repository_contacts.get_contacts_version(user, db)
+
+    async def update_contact():
+        body = ContactModel(first_name=sample.first_name, surname=sample.surname, email=sample.email,
+                            phone_number=sample.phone_number, birthday=sample.birthday)
+        await repository_contacts.update_contact(body, db, user, sample.id)
+
+    async def create_and_remove_contact():
+        phone = f"999{next(phones)}"
+        body = ContactModel(first_name="Bench", surname="Bench", email=f"bench{phone}@example.com",
+                            phone_number=phone, birthday=date(2000, 1, 1))
+        contact = await repository_contacts.create_contact(body, user, db)
+        await repository_contacts.remove_contact(contact.id, user, db)
+
+    async def stream_contacts():
+        async for _ in repository_contacts.stream_contacts(user, db):
+            pass
+
+    yield f"{prefix}.get_contacts", get_contacts
+    yield f"{prefix}.get_contacts (offset {rows // 2})", get_contacts_deep_offset
+    yield f"{prefix}.get_contacts (keyset by surname)", get_contacts_keyset
+    yield f"{prefix}.query_contacts", query_contacts
+    yield f"{prefix}.get_contact_by_id", get_contact_by_id
+    yield f"{prefix}.get_contact_by_email", get_contact_by_email
+    yield f"{prefix}.get_contact_by_name", get_contact_by_name
+    yield f"{prefix}.get_contact_by_surname", get_contact_by_surname
+    yield f"{prefix}.get_contact_by_phone", get_contact_by_phone
+    yield f"{prefix}.search_contacts", search_contacts
+    yield f"{prefix}.get_birthday_contact", get_birthday_contact
+    yield f"{prefix}.get_contacts_version", get_contacts_version
+    yield f"{prefix}.update_contact", update_contact
+    yield f"{prefix}.create_contact + remove_contact", create_and_remove_contact
+    if rows <= MAX_EXPORT_ROWS:
+        yield f"{prefix}.stream_contacts", stream_contacts
@@ -0,0 +1,25 @@
+"""
+Serialization of contact lists, the last step of every cache miss.
+"""
+from datetime import date, datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from src.database.models import Contact
+from src.schemas import ContactResponse
+
+from benchmarks.data import generate_contacts
+
+contact_list_adapter = TypeAdapter(List[ContactResponse])
+
+
+async def cases(options: dict):
+    for size in (10, 50, 1000):
+        contacts = [Contact(id=number, created_at=datetime(2024, 1, 1), **row)
+                    for number, row in enumerate(generate_contacts(1, size), start=1)]
+
+        def serialize(contacts=contacts):
+            contact_list_adapter.dump_json(contact_list_adapter.validate_python(contacts, from_attributes=True))
+
+        yield f"schemas.ContactResponse list x{size}", serialize
@@ -0,0 +1,149 @@
+"""
+Timing, baselines and regression checks shared by the benchmarks.
+"""
+import inspect
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+BASELINES = Path(__file__).parent / "baselines"
+
+Case = tuple[str, Callable[[], Any]]
+
+
+async def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Times a sync or async callable, calling it in loops long enough for the clock to be precise.
+
+    :param func: The code to time, called without arguments.
+    :type func: Callable[[], Any]
+    :param repeat: The number of timed loops.
+    :type repeat: int
+    :param min_time: The minimum duration of a loop, in seconds.
+    :type min_time: float
+    :return: The time per call in microseconds (median, min, mean and stdev over the loops) and the calls per loop.
+    :rtype: dict
+    """
+    is_async = inspect.iscoroutinefunction(func)
+
+    async def loop(number: int) -> float:
+        start = time.perf_counter()
+        if is_async:
+            for _ in range(number):
+                await func()
+        else:
+            for _ in range(number):
+                func()
+        return time.perf_counter() - start
+
+    number = 1
+    while (elapsed := await loop(number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    samples = [await loop(number) / number * 1e6 for _ in range(repeat)]
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "mean_us": statistics.fmean(samples),
+        "stdev_us": statistics.stdev(samples) if repeat > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+async def run(suites: list[Callable[..., AsyncIterator[Case]]], options: dict, name_filter: str = None,
+              repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Runs the cases of every suite and prints their timings as they finish.
+
+    :param suites: Async generators that set up and yield named cases, then tear down.
+    :type suites: list[Callable[..., AsyncIterator[Case]]]
+    :param options: Passed to every suite, e.g. the row counts and the database URL.
+    :type options: dict
+    :param name_filter: Only cases whose name contains it are timed.
+    :type name_filter: str
+    :param repeat: The number of timed loops per case.
+    :type repeat: int
+    :param min_time: The minimum duration of a loop, in seconds.
+    :type min_time: float
+    :return: The results with the platform they were measured on.
+    :rtype: dict
+    """
+    results = {}
+    for suite in suites:
+        async for name, func in suite(options):
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = await measure(func, repeat, min_time)
+            print(f"{name:<60} {format_time(results[name]['median_us']):>12}")
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {key: value for key, value in options.items() if key != "database_url"},
+        },
+        "results": results,
+    }
+
+
+def format_time(microseconds: float) -> str:
+    if microseconds >= 1e6:
+        return f"{microseconds / 1e6:.2f} s"
+    if microseconds >= 1e3:
+        return f"{microseconds / 1e3:.2f} ms"
+    return f"{microseconds:.2f} µs"
+
+
+def baseline_path(name: str) -> Path:
+    """
+    Resolves a baseline name to its file, ``benchmarks/baselines/<name>.json``, or keeps a path as it is.
+    """
+    path = Path(name)
+    return path if path.suffix == ".json" else BASELINES / f"{name}.json"
+
+
+def save(report: dict, name: str) -> Path:
+    path = baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+
+def load(name: str) -> dict:
+    return json.loads(baseline_path(name).read_text())
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """
+    Compares the median times of the cases found in both reports and prints a table.
+
+    :param baseline: The report to compare against.
+    :type baseline: dict
+    :param current: The new report.
+    :type current: dict
+    :param threshold: The relative slowdown tolerated, e.g. 0.1 for 10%.
+    :type threshold: float
+    :return: The names of the cases that got slower than tolerated.
+    :rtype: list[str]
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<60} {format_time(result['median_us']):>12} {'new':>10}")
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = ""
+        print(f"{name:<60} {format_time(before['median_us']):>12} {format_time(result['median_us']):>12} "
+              f"{change:>+8.1%} {status}")
+    return regressions
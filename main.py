@@ -1,10 +1,13 @@
-import redis.asyncio as redis
 from fastapi import FastAPI
-from fastapi_limiter import FastAPILimiter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 
-from src.routes import contacts, auth, users
+from src.routes import contacts, auth, users, internal, metrics
 from src.conf.config import settings
+from src.database.instrumentation import QueryMiddleware
+from src.services.memory import MemoryMiddleware, memory_tracker
+from src.services.profiling import ProfilingMiddleware, profile_store
+from src.services.metrics import MetricsMiddleware, request_metrics
 
 
 app = FastAPI()
@@ -17,18 +20,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-DB-Query-Count", "X-DB-Query-Time", "X-DB-Repeated-Queries",
+                    "X-Profile-Id"],
 )
+app.add_middleware(MemoryMiddleware, tracker=memory_tracker)
+app.add_middleware(QueryMiddleware)
+app.add_middleware(ProfilingMiddleware, store=profile_store, sample_rate=settings.profiling_sample_rate)
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(contacts.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(internal.router, prefix="/api")
 
+if settings.memory_tracing:
+    memory_tracker.start(settings.memory_trace_frames)
 
-@app.on_event("startup")
-async def startup():
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, encoding="utf-8",
-                          decode_responses=True)
-    await FastAPILimiter.init(r)
+if settings.metrics_enabled:
+    # Added last, so it is the outermost middleware and its timings include CORS handling
+    app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+    app.include_router(metrics.router)
+
+if settings.storage_backend == "local":
+    app.mount(settings.media_url, StaticFiles(directory=settings.media_root), name="media")
 
 
 @app.get("/")
@@ -0,0 +1,39 @@
+"""per user contact indexes
+
+Revision ID: 3c1f9e7a4b52
+Revises: f67cad4b3837
+Create Date: 2026-10-17 10:12:31.408112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9e7a4b52'
+down_revision: Union[str, None] = 'f67cad4b3837'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The unique constraints also serve the (user_id, email) and (user_id, phone_number) lookups
+    op.drop_constraint('contacts_email_key', 'contacts', type_='unique')
+    op.drop_constraint('contacts_phone_number_key', 'contacts', type_='unique')
+    op.create_unique_constraint('uq_contacts_user_id_email', 'contacts', ['user_id', 'email'])
+    op.create_unique_constraint('uq_contacts_user_id_phone_number', 'contacts', ['user_id', 'phone_number'])
+    op.create_index('ix_contacts_user_id_id', 'contacts', ['user_id', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_first_name', 'contacts', ['user_id', 'first_name'], unique=False)
+    op.create_index('ix_contacts_user_id_surname', 'contacts', ['user_id', 'surname'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_surname', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_first_name', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_id', table_name='contacts')
+    op.drop_constraint('uq_contacts_user_id_phone_number', 'contacts', type_='unique')
+    op.drop_constraint('uq_contacts_user_id_email', 'contacts', type_='unique')
+    op.create_unique_constraint('contacts_phone_number_key', 'contacts', ['phone_number'])
+    op.create_unique_constraint('contacts_email_key', 'contacts', ['email'])
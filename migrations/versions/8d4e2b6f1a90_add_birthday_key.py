@@ -0,0 +1,32 @@
+"""add birthday key
+
+Revision ID: 8d4e2b6f1a90
+Revises: 3c1f9e7a4b52
+Create Date: 2026-10-17 11:03:54.217640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e2b6f1a90'
+down_revision: Union[str, None] = '3c1f9e7a4b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column(
+        'birthday_key', sa.Integer(),
+        sa.Computed('CAST(EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday) AS INTEGER)',
+                    persisted=True),
+        nullable=True))
+    op.create_index('ix_contacts_user_id_birthday_key', 'contacts', ['user_id', 'birthday_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_key', table_name='contacts')
+    op.drop_column('contacts', 'birthday_key')
@@ -0,0 +1,35 @@
+"""keyset contact indexes
+
+Revision ID: b7a05c3d92e1
+Revises: 8d4e2b6f1a90
+Create Date: 2026-10-17 12:26:08.935114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7a05c3d92e1'
+down_revision: Union[str, None] = '8d4e2b6f1a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (user_id, <sort key>, id) still serves the equality lookups on (user_id, <sort key>)
+    op.drop_index('ix_contacts_user_id_first_name', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_surname', table_name='contacts')
+    op.create_index('ix_contacts_user_id_first_name_id', 'contacts', ['user_id', 'first_name', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_surname_id', 'contacts', ['user_id', 'surname', 'id'], unique=False)
+    op.create_index('ix_contacts_user_id_birthday_id', 'contacts', ['user_id', 'birthday', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_surname_id', table_name='contacts')
+    op.drop_index('ix_contacts_user_id_first_name_id', table_name='contacts')
+    op.create_index('ix_contacts_user_id_surname', 'contacts', ['user_id', 'surname'], unique=False)
+    op.create_index('ix_contacts_user_id_first_name', 'contacts', ['user_id', 'first_name'], unique=False)
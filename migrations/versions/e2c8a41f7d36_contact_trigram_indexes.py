@@ -0,0 +1,32 @@
+"""contact trigram indexes
+
+Revision ID: e2c8a41f7d36
+Revises: b7a05c3d92e1
+Create Date: 2026-10-17 14:41:19.556023
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c8a41f7d36'
+down_revision: Union[str, None] = 'b7a05c3d92e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_COLUMNS = ('first_name', 'surname', 'email', 'phone_number')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(f'ix_contacts_{column}_trgm', 'contacts', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for column in reversed(TRIGRAM_COLUMNS):
+        op.drop_index(f'ix_contacts_{column}_trgm', table_name='contacts', postgresql_using='gin')
@@ -8,15 +8,69 @@ class Settings(BaseSettings):
     postgres_password: str
     postgres_port: int
     sqlalchemy_database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    debug: bool = False
+    slow_query_threshold: float = 0.1
+    query_repeat_threshold: int = 5
+    admin_emails: list[str] = []
+    profiling_sample_rate: float = 0
+    profiling_dir: str = 'profiles'
+    profiling_max_profiles: int = 50
+    memory_tracing: bool = False
+    memory_trace_frames: int = 1
     secret_key: str
     algorithm: str
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
     mail_username: str
     mail_password: str
     mail_from: str
     mail_port: int
     mail_server: str
+    mail_ssl_tls: bool = True
+    mail_starttls: bool = False
+    mail_use_credentials: bool = True
+    mail_timeout: float = 30
+    mail_pool_size: int = 2
+    outbox_batch_size: int = 50
+    outbox_poll_interval: float = 1
+    outbox_max_attempts: int = 5
+    outbox_retry_backoff: float = 30
+    outbox_claim_timeout: float = 300
     redis_host: str = 'localhost'
     redis_port: int = 6379
+    user_cache_ttl: int = 300
+    user_cache_local_ttl: float = 5
+    user_cache_size: int = 1024
+    response_cache_ttl: int = 300
+    response_cache_local_ttl: float = 2
+    response_cache_size: int = 4096
+    import_batch_size: int = 500
+    import_max_errors: int = 1000
+    export_batch_size: int = 1000
+    search_similarity_threshold: float = 0.3
+    rate_limit_read_times: int = 2
+    rate_limit_read_seconds: float = 5
+    rate_limit_write_times: int = 1
+    rate_limit_write_seconds: float = 5
+    rate_limit_sync_interval: float = 1
+    rate_limit_cache_size: int = 10000
+    storage_backend: str = 'cloudinary'
+    storage_workers: int = 4
+    media_root: str = 'media'
+    media_url: str = '/media'
+    image_workers: int = 2
+    avatar_sizes: list[int] = [250, 64]
+    avatar_format: str = 'webp'
+    avatar_quality: int = 85
+    avatar_max_size: int = 10 * 1024 * 1024
+    metrics_enabled: bool = True
+    # Bearer token Prometheus scrapes /metrics with, the endpoint rejects every request while it is unset
+    metrics_token: str | None = None
     cloudinary_name: str
     cloudinary_api_key: int
     cloudinary_api_secret: str
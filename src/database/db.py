@@ -1,19 +1,63 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from src.conf.config import settings
+from src.database.instrumentation import instrument
+from src.database.pool import MeteredQueuePool
+from src.database.trigram import similarity
+from src.services.metrics import request_metrics
+
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_url(url: str) -> str:
+    """
+    Converts a database URL to the URL of the matching async driver.
+
+    Alembic keeps using the synchronous URL from the settings, the application works through the async one.
+
+    :param url: The database URL from the settings.
+    :type url: str
+    :return: The database URL with an async driver.
+    :rtype: str
+    """
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+@event.listens_for(Engine, "connect")
+def register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Registers a Python ``similarity()`` on SQLite connections, which have no ``pg_trgm``.
+    """
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("similarity", 2, similarity, deterministic=True)
 
 
 SQL_DATABASE_URL = settings.sqlalchemy_database_url
-engine = create_engine(SQL_DATABASE_URL)
+ASYNC_SQL_DATABASE_URL = get_async_url(SQL_DATABASE_URL)
+engine = create_async_engine(
+    ASYNC_SQL_DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+instrument(engine.sync_engine)
 
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+@request_metrics.timed("get_db")
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,140 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    The statements run while serving one request, with the time spent in the database.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """
+        Finds the statements run at least ``threshold`` times, the sign of a query in a loop (N+1).
+
+        Statements are compared with their placeholders, so the same query for different rows counts as a repeat.
+
+        :param threshold: The number of runs from which a statement is reported.
+        :type threshold: int
+        :return: The number of runs of every repeated statement.
+        :rtype: dict[str, int]
+        """
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+current_queries: ContextVar[QueryStats | None] = ContextVar("current_queries", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Records the statements run in the current context, e.g. one request, a task or a block of a test.
+
+    :return: The statistics, updated as statements run.
+    :rtype: Iterator[QueryStats]
+    """
+    stats = QueryStats()
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+
+def bind_shape(parameters, executemany: bool) -> str:
+    """
+    Describes the bound parameters by their types only, so logs never contain the values.
+
+    :param parameters: The parameters passed to the DBAPI cursor.
+    :param executemany: Whether the statement runs once per parameter set.
+    :type executemany: bool
+    :return: E.g. ``(int, str)`` or ``500 x (int, str)``.
+    :rtype: str
+    """
+    if executemany:
+        parameters = list(parameters)
+        return f"{len(parameters)} x {bind_shape(parameters[0], False)}" if parameters else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters or ()) + ")"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is discarded with the statement even when it fails
+    context._query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._query_start
+    stats = current_queries.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration >= settings.slow_query_threshold:
+        logger.warning("Slow query (%.1f ms, binds %s): %s", duration * 1e3, bind_shape(parameters, executemany),
+                       statement)
+
+
+def instrument(engine: Engine):
+    """
+    Times every statement of an engine, logs the slow ones and counts them in the :func:`track_queries` context.
+
+    :param engine: The synchronous engine, ``AsyncEngine.sync_engine`` for an async one.
+    :type engine: Engine
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class QueryMiddleware:
+    """
+    ASGI middleware that tracks the statements of every HTTP request and warns about repeated ones.
+
+    With ``settings.debug`` the query count, the database time in milliseconds and the number of repeated statements
+    are sent in the ``X-DB-Query-Count``, ``X-DB-Query-Time`` and ``X-DB-Repeated-Queries`` response headers.
+    Statements run after the response has started, e.g. by a streaming export, are logged but not in the headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        threshold = settings.query_repeat_threshold
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and settings.debug:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Query-Time"] = f"{stats.duration * 1e3:.2f}"
+                headers["X-DB-Repeated-Queries"] = str(len(stats.repeated(threshold)))
+            await send(message)
+
+        with track_queries() as stats:
+            await self.app(scope, receive, send_wrapper)
+        for statement, count in stats.repeated(threshold).items():
+            logger.warning("Repeated query, %d runs in %s %s: %s", count, scope["method"], route_template(scope),
+                           statement)
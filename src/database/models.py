@@ -1,5 +1,8 @@
-from sqlalchemy import Column, Integer, String, func, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, func, ForeignKey, Boolean, Index, UniqueConstraint, Computed, literal_column, \
+    JSON, Text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 from sqlalchemy.sql.sqltypes import DateTime, Date
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -7,14 +10,52 @@ from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 
 
+class month_day(FunctionElement):
+    """
+    The month and day of a date as a sortable ``MMDD`` integer, e.g. 1122 for November 22.
+    """
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(month_day)
+def compile_month_day(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return f"CAST(EXTRACT(MONTH FROM {value}) * 100 + EXTRACT(DAY FROM {value}) AS INTEGER)"
+
+
+@compiles(month_day, "sqlite")
+def compile_month_day_sqlite(element, compiler, **kw):
+    value = compiler.process(element.clauses, **kw)
+    return f"CAST(strftime('%m%d', {value}) AS INTEGER)"
+
+
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'email', name='uq_contacts_user_id_email'),
+        UniqueConstraint('user_id', 'phone_number', name='uq_contacts_user_id_phone_number'),
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+        Index('ix_contacts_user_id_first_name_id', 'user_id', 'first_name', 'id'),
+        Index('ix_contacts_user_id_surname_id', 'user_id', 'surname', 'id'),
+        Index('ix_contacts_user_id_birthday_id', 'user_id', 'birthday', 'id'),
+        Index('ix_contacts_user_id_birthday_key', 'user_id', 'birthday_key'),
+        Index('ix_contacts_first_name_trgm', 'first_name', postgresql_using='gin',
+              postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        Index('ix_contacts_surname_trgm', 'surname', postgresql_using='gin',
+              postgresql_ops={'surname': 'gin_trgm_ops'}),
+        Index('ix_contacts_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}),
+        Index('ix_contacts_phone_number_trgm', 'phone_number', postgresql_using='gin',
+              postgresql_ops={'phone_number': 'gin_trgm_ops'}),
+    )
     id = Column(Integer, primary_key=True)
     first_name = Column(String(30), nullable=False)
     surname = Column(String(30))
-    email = Column(String, unique=True)
-    phone_number = Column(String, unique=True, nullable=False)
+    email = Column(String)
+    phone_number = Column(String, nullable=False)
     birthday = Column(Date)
+    birthday_key = Column(Integer, Computed(month_day(literal_column('birthday'))))
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
@@ -31,3 +72,20 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     refresh_token = Column(String(255), nullable=True)
     confirmed = Column(Boolean, default=False)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index('ix_email_outbox_pending', 'id', postgresql_where=literal_column("status = 'pending'")),
+    )
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(250), nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    retry_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime, nullable=True)
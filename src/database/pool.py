@@ -0,0 +1,40 @@
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.services.metrics import Histogram
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records how long every checkout waited for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+
+def get_pool_status(pool: MeteredQueuePool) -> dict:
+    """
+    Collects the current saturation of a connection pool.
+
+    :param pool: The connection pool of the engine.
+    :type pool: MeteredQueuePool
+    :return: The pool size, checked out and idle connections, overflow and the checkout wait histogram.
+    :rtype: dict
+    """
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkout_wait": pool.checkout_wait.snapshot(),
+    }
@@ -0,0 +1,41 @@
+import re
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(value: str) -> set[str]:
+    """
+    Splits a string into trigrams the same way ``pg_trgm`` does.
+
+    Every word is lowercased and padded with two spaces in front and one behind.
+
+    :param value: The string to split.
+    :type value: str
+    :return: The set of trigrams.
+    :rtype: set[str]
+    """
+    result = set()
+    for word in WORD_RE.findall(value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(left: str | None, right: str | None) -> float:
+    """
+    Python version of ``pg_trgm``'s ``similarity()`` for databases without the extension.
+
+    :param left: The first string.
+    :type left: str | None
+    :param right: The second string.
+    :type right: str | None
+    :return: The share of common trigrams, from 0 to 1.
+    :rtype: float
+    """
+    if left is None or right is None:
+        return 0.0
+    left, right = trigrams(left), trigrams(right)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
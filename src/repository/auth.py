@@ -1,32 +1,35 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
 from src.database.models import User
 from src.schemas import UserModel
+from src.services.cache import user_cache
 
 
-async def get_user_by_email(email: str, db: Session) -> User | None:
+async def get_user_by_email(email: str, db: AsyncSession) -> User | None:
     """
     Retrieves a user from the database based on the provided email.
 
     :param email: The email address of the user to search for.
     :type email: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The user with the specified email if found, otherwise None.
     :rtype: User | None
     """
-    return db.query(User).filter_by(email=email).first()
+    user = await db.execute(select(User).filter_by(email=email))
+    return user.scalar_one_or_none()
 
 
-async def create_user(body: UserModel, db: Session):
+async def create_user(body: UserModel, db: AsyncSession):
     """
     Creates a new user in the database.
 
     :param body: The data for the user to create.
     :type body: UserModel
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The newly created user.
     :rtype: User
     """
@@ -34,12 +37,12 @@ async def create_user(body: UserModel, db: Session):
 
     new_user = User(**body.model_dump(), avatar=g.get_image())
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: User, refresh_token, db: Session):
+async def update_token(user: User, refresh_token, db: AsyncSession):
     """
     Updates the refresh token for a specific user in the database.
 
@@ -47,7 +50,8 @@ async def update_token(user: User, refresh_token, db: Session):
     :type user: User
     :param refresh_token: The new refresh token to set.
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     """
     user.refresh_token = refresh_token
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user.email)
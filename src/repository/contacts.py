@@ -1,17 +1,95 @@
-from datetime import datetime
+import calendar
+from datetime import date, timedelta
+from typing import List
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.conf.config import settings
 from src.database.models import Contact
-from src.schemas import ContactModel
+from src.schemas import ContactModel, ContactFilter
 from src.database.models import User
+from src.services.cache import contacts_cache
 
 
-async def get_contacts(limit: int, skip: int, user: User, db: Session):
+SORT_COLUMNS = {
+    "id": Contact.id,
+    "name": Contact.first_name,
+    "surname": Contact.surname,
+    "birthday": Contact.birthday,
+}
+
+
+def apply_sort(stmt, sort: str, after: tuple = None):
+    """
+    Orders a contacts statement by a sort key and then by ID, optionally starting right after a given row.
+
+    The order matches the ``(user_id, <sort key>, id)`` indexes, so a keyset page costs the same at any depth: the
+    cursor is a row-value comparison ``(<sort key>, id) > (value, last_id)``, which starts an index range scan. Rows
+    with a NULL sort key come last and are never matched by it, :func:`fetch_page` reads them once the cursor has
+    passed the other rows.
+
+    :param stmt: The select statement of contacts.
+    :type stmt: Select
+    :param sort: The sort key, one of ``SORT_COLUMNS``.
+    :type sort: str
+    :param after: The sort key value and the ID of the last contact of the previous page.
+    :type after: tuple
+    :return: The ordered statement.
+    :rtype: Select
+    """
+    column = SORT_COLUMNS[sort]
+    if column is Contact.id:
+        stmt = stmt.order_by(Contact.id)
+    else:
+        stmt = stmt.order_by(column.asc().nulls_last(), Contact.id)
+    if after is not None:
+        value, last_id = after
+        if column is Contact.id:
+            stmt = stmt.filter(Contact.id > last_id)
+        elif value is None:
+            stmt = stmt.filter(column.is_(None) & (Contact.id > last_id))
+        else:
+            stmt = stmt.filter(tuple_(column, Contact.id) > tuple_(value, last_id))
+    return stmt
+
+
+async def fetch_page(stmt, limit: int, db: AsyncSession, sort: str = "id", after: tuple = None):
+    """
+    Reads one page of contacts in the order of :func:`apply_sort`.
+
+    When the page after a non-null cursor runs out of rows with a sort key, it is filled up with the rows whose sort
+    key is NULL, so those are paged through as well.
+
+    :param stmt: The select statement of contacts, filtered but neither ordered nor limited.
+    :type stmt: Select
+    :param limit: The maximum number of contacts to retrieve.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :param sort: The sort key, one of ``SORT_COLUMNS``.
+    :type sort: str
+    :param after: The sort key value and the ID of the last contact of the previous page.
+    :type after: tuple
+    :return: The contacts of the page.
+    :rtype: List[Contact]
+    """
+    contacts = await db.execute(apply_sort(stmt, sort, after).limit(limit))
+    contacts = contacts.scalars().all()
+    column = SORT_COLUMNS[sort]
+    if len(contacts) < limit and after is not None and after[0] is not None and column.nullable:
+        nulls = await db.execute(stmt.filter(column.is_(None)).order_by(Contact.id).limit(limit - len(contacts)))
+        contacts = [*contacts, *nulls.scalars().all()]
+    return contacts
+
+
+async def get_contacts(limit: int, skip: int, user: User, db: AsyncSession, sort: str = "id", after: tuple = None):
     """
     Retrieves a list of contacts for a specific user from the database.
 
+    When ``after`` is given the page starts right after that row (keyset pagination) and ``skip`` is ignored.
+
     :param limit: The maximum number of contacts to retrieve.
     :type limit: int
     :param skip: The number of contacts to skip before starting to return items.
@@ -19,14 +97,110 @@ async def get_contacts(limit: int, skip: int, user: User, db: Session):
     :param user: The user for whom to retrieve contacts.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
+    :param sort: The sort key, one of ``SORT_COLUMNS``.
+    :type sort: str
+    :param after: The sort key value and the ID of the last contact of the previous page.
+    :type after: tuple
     :return: A list of contacts for the specified user.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter_by(user_id=user.id).limit(limit).offset(skip).all()
+    stmt = select(Contact).filter(Contact.user_id == user.id)
+    if after is not None:
+        return await fetch_page(stmt, limit, db, sort, after)
+    contacts = await db.execute(apply_sort(stmt, sort).offset(skip).limit(limit))
+    return contacts.scalars().all()
+
+
+async def get_contacts_version(user: User, db: AsyncSession):
+    """
+    Retrieves the number of contacts of a specific user and the time of the latest change among them.
+
+    :param user: The user whose contacts to describe.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The number of contacts and the latest ``updated_at``, which change whenever the contacts do.
+    :rtype: tuple[int, datetime | None]
+    """
+    stmt = select(func.count(Contact.id), func.max(Contact.updated_at)).filter(Contact.user_id == user.id)
+    version = await db.execute(stmt)
+    return tuple(version.one())
+
+
+async def query_contacts(filters: ContactFilter, limit: int, user: User, db: AsyncSession, sort: str = "id",
+                         after: tuple = None):
+    """
+    Retrieves contacts of a specific user matching any combination of filters with a single statement.
+
+    :param filters: The filters to apply, unset filters are ignored.
+    :type filters: ContactFilter
+    :param limit: The maximum number of contacts to retrieve.
+    :type limit: int
+    :param user: The user for whom to retrieve contacts.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :param sort: The sort key, one of ``SORT_COLUMNS``.
+    :type sort: str
+    :param after: The sort key value and the ID of the last contact of the previous page.
+    :type after: tuple
+    :return: A list of matching contacts.
+    :rtype: List[Contact]
+    """
+    conditions = [Contact.user_id == user.id]
+    for field, column in (("first_name", Contact.first_name), ("surname", Contact.surname),
+                          ("email", Contact.email), ("phone_number", Contact.phone_number)):
+        value = getattr(filters, field)
+        if value is not None:
+            conditions.append(column == value)
+    for prefix, column in (("birthday", Contact.birthday), ("created", Contact.created_at),
+                           ("updated", Contact.updated_at)):
+        start, end = getattr(filters, f"{prefix}_from"), getattr(filters, f"{prefix}_to")
+        if start is not None:
+            conditions.append(column >= start)
+        if end is not None:
+            conditions.append(column <= end)
+    return await fetch_page(select(Contact).filter(*conditions), limit, db, sort, after)
+
+
+EXPORT_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.surname,
+    Contact.email,
+    Contact.phone_number,
+    Contact.birthday,
+)
+
+
+async def stream_contacts(user: User, db: AsyncSession, batch_size: int = 1000):
+    """
+    Streams all contacts of a specific user from a server-side cursor.
 
+    Plain columns are selected instead of ``Contact`` entities, so no ORM objects pile up in the identity map.
 
-async def get_contact_by_id(contact_id: int, user: User, db: Session):
+    :param user: The user whose contacts to stream.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :param batch_size: The number of rows fetched from the cursor at a time.
+    :type batch_size: int
+    :return: An async iterator over batches of contact rows.
+    :rtype: AsyncIterator[List[RowMapping]]
+    """
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .filter(Contact.user_id == user.id)
+        .order_by(Contact.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.mappings().partitions():
+        yield partition
+
+
+async def get_contact_by_id(contact_id: int, user: User, db: AsyncSession):
     """
     Retrieves a contact by its ID for a specific user from the database.
 
@@ -35,14 +209,16 @@ async def get_contact_by_id(contact_id: int, user: User, db: Session):
     :param user: The user for whom to retrieve the contact.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The contact with the specified ID for the given user, or None if not found.
     :rtype: Contact | None
     """
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    contact = await db.execute(stmt)
+    return contact.scalar_one_or_none()
 
 
-async def get_contact_by_email(contact_email: str, user: User, db: Session):
+async def get_contact_by_email(contact_email: str, user: User, db: AsyncSession):
     """
     Retrieves a contact by its email address for a specific user from the database.
 
@@ -51,14 +227,16 @@ async def get_contact_by_email(contact_email: str, user: User, db: Session):
     :param user: The user for whom to retrieve the contact.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The contact with the specified email address for the given user, or None if not found.
     :rtype: Contact | None
     """
-    return db.query(Contact).filter(and_(Contact.email == contact_email, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.email == contact_email, Contact.user_id == user.id))
+    contact = await db.execute(stmt)
+    return contact.scalar_one_or_none()
 
 
-async def get_contact_by_name(contact_name: str, user: User, db: Session):
+async def get_contact_by_name(contact_name: str, user: User, db: AsyncSession):
     """
     Retrieves contacts by name for a specific user from the database.
 
@@ -67,14 +245,16 @@ async def get_contact_by_name(contact_name: str, user: User, db: Session):
     :param user: The user for whom to retrieve the contacts.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: A list of contacts with the specified name for the given user, or an empty list if none are found.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(and_(Contact.first_name == contact_name, Contact.user_id == user.id)).all()
+    stmt = select(Contact).filter(and_(Contact.first_name == contact_name, Contact.user_id == user.id))
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
 
 
-async def get_contact_by_surname(contact_surname: str, user: User, db: Session):
+async def get_contact_by_surname(contact_surname: str, user: User, db: AsyncSession):
     """
     Retrieves contacts by surname for a specific user from the database.
 
@@ -83,14 +263,63 @@ async def get_contact_by_surname(contact_surname: str, user: User, db: Session):
     :param user: The user for whom to retrieve the contacts.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: A list of contacts with the specified surname for the given user, or an empty list if none are found.
     :rtype: List[Contact]
     """
-    return db.query(Contact).filter(and_(Contact.surname == contact_surname, Contact.user_id == user.id)).all()
+    stmt = select(Contact).filter(and_(Contact.surname == contact_surname, Contact.user_id == user.id))
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+SEARCH_COLUMNS = (Contact.first_name, Contact.surname, Contact.email, Contact.phone_number)
+
+
+async def search_contacts(query: str, user: User, db: AsyncSession, limit: int = 20):
+    """
+    Searches contacts of a specific user by prefix, substring or a similar spelling.
 
+    First name, surname, email and phone number are matched with ``ILIKE`` and with trigram similarity. Prefix
+    matches come first, then contacts are ranked by their best similarity, which must reach
+    ``settings.search_similarity_threshold``. On PostgreSQL both conditions are served by the ``pg_trgm`` GIN indexes,
+    on SQLite ``similarity()`` is a Python function registered on the connection.
 
-async def get_contact_by_phone(phone: str, user: User, db: Session):
+    :param query: The search text.
+    :type query: str
+    :param user: The user whose contacts to search.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :param limit: The maximum number of contacts to return.
+    :type limit: int
+    :return: A list of matching contacts, best matches first.
+    :rtype: List[Contact]
+    """
+    escaped = query.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    prefix = or_(*[column.ilike(f"{escaped}%", escape="!") for column in SEARCH_COLUMNS])
+    substring = [column.ilike(f"%{escaped}%", escape="!") for column in SEARCH_COLUMNS]
+    similarities = [func.similarity(column, query) for column in SEARCH_COLUMNS]
+    if db.bind.dialect.name == "postgresql":
+        # The % operator compares against pg_trgm.similarity_threshold and can use the GIN index, so the threshold
+        # is set for the current transaction. set_config() takes bound parameters, unlike SET LOCAL.
+        await db.execute(select(func.set_config("pg_trgm.similarity_threshold",
+                                                str(settings.search_similarity_threshold), True)))
+        similar = [column.op("%")(query) for column in SEARCH_COLUMNS]
+        rank = func.greatest(*similarities)
+    else:
+        similar = [value >= settings.search_similarity_threshold for value in similarities]
+        rank = func.max(*similarities)
+    stmt = (
+        select(Contact)
+        .filter(Contact.user_id == user.id, or_(*substring, *similar))
+        .order_by(prefix.desc(), rank.desc(), Contact.id)
+        .limit(limit)
+    )
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+async def get_contact_by_phone(phone: str, user: User, db: AsyncSession):
     """
     Retrieves a contact by phone number for a specific user from the database.
 
@@ -99,14 +328,16 @@ async def get_contact_by_phone(phone: str, user: User, db: Session):
     :param user: The user for whom to retrieve the contact.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The contact with the specified phone number for the given user, or None if not found.
     :rtype: Contact | None
     """
-    return db.query(Contact).filter(and_(Contact.phone_number == phone, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.phone_number == phone, Contact.user_id == user.id))
+    contact = await db.execute(stmt)
+    return contact.scalar_one_or_none()
 
 
-async def create_contact(body: ContactModel, user: User, db: Session):
+async def create_contact(body: ContactModel, user: User, db: AsyncSession):
     """
     Creates a new contact for a specific user in the database.
 
@@ -115,25 +346,59 @@ async def create_contact(body: ContactModel, user: User, db: Session):
     :param user: The user for whom to create the contact.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The newly created contact.
     :rtype: Contact
     """
-    contact = Contact(**body.model_dump(), user=user)
+    contact = Contact(**body.model_dump(), user_id=user.id)
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    await db.commit()
+    await db.refresh(contact)
+    await contacts_cache.bump(user.id)
     return contact
 
 
-async def update_contact(body: ContactModel, db: Session, user: User, contact_id: int):
+async def create_contacts(bodies: List[ContactModel], user: User, db: AsyncSession):
+    """
+    Creates many contacts for a specific user with a single statement, skipping duplicates.
+
+    Contacts whose phone number or email already exists for the user are left out by ``ON CONFLICT DO NOTHING``
+    instead of failing the whole batch.
+
+    :param bodies: The data for the contacts to create.
+    :type bodies: List[ContactModel]
+    :param user: The user for whom to create the contacts.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The phone numbers of the contacts that were created.
+    :rtype: Set[str]
+    """
+    if not bodies:
+        return set()
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    stmt = (
+        insert(Contact)
+        .values([{**body.model_dump(), "user_id": user.id} for body in bodies])
+        .on_conflict_do_nothing()
+        .returning(Contact.phone_number)
+    )
+    created = await db.execute(stmt)
+    created = set(created.scalars().all())
+    await db.commit()
+    if created:
+        await contacts_cache.bump(user.id)
+    return created
+
+
+async def update_contact(body: ContactModel, db: AsyncSession, user: User, contact_id: int):
     """
     Updates an existing contact for a specific user in the database.
 
     :param body: The updated data for the contact.
     :type body: ContactModel
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user: The user to whom the contact belongs.
     :type user: User
     :param contact_id: The ID of the contact to update.
@@ -148,11 +413,13 @@ async def update_contact(body: ContactModel, db: Session, user: User, contact_id
         contact.email = body.email
         contact.phone_number = body.phone_number
         contact.birthday = body.birthday
-        db.commit()
+        await db.commit()
+        await db.refresh(contact)
+        await contacts_cache.bump(user.id)
     return contact
 
 
-async def remove_contact(contact_id: int, user: User, db: Session):
+async def remove_contact(contact_id: int, user: User, db: AsyncSession):
     """
     Removes an existing contact for a specific user from the database.
 
@@ -161,38 +428,48 @@ async def remove_contact(contact_id: int, user: User, db: Session):
     :param user: The user to whom the contact belongs.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The removed contact if found, otherwise None.
     :rtype: Contact | None
     """
     contact = await get_contact_by_id(contact_id, user, db)
     if contact:
-        db.delete(contact)
-        db.commit()
+        await db.delete(contact)
+        await db.commit()
+        await contacts_cache.bump(user.id)
     return contact
 
 
-async def get_birthday_contact(user: User, db: Session):
+async def get_birthday_contact(user: User, db: AsyncSession, days: int = 7):
     """
     Retrieves contacts with upcoming birthdays for a specific user from the database.
 
+    The window is matched against the indexed ``birthday_key`` (``MMDD``) column, so it wraps from December
+    into January, and February 29 birthdays fall on February 28 in non-leap years.
+
     :param user: The user for whom to retrieve contacts.
     :type user: User
     :param db: The database session.
-    :type db: Session
-    :return: A list of contacts with birthdays within the next 7 days.
+    :type db: AsyncSession
+    :param days: The number of days ahead to look for birthdays.
+    :type days: int
+    :return: A list of contacts with birthdays within the next days, ordered by the upcoming birthday.
     :rtype: List[Contact]
     """
-    contacts = db.query(Contact).filter_by(user_id=user.id).all()
-    contacts_result = []
-    today = datetime.now().date()
-    if contacts:
-        for contact in contacts:
-            contact_birthday = contact.birthday.replace(year=datetime.now().year)
-            maybe_seven_days = (contact_birthday - today).days
-            if 0 <= maybe_seven_days <= 7:
-                contacts_result.append(contact)
-    if contacts_result:
-        return contacts_result
+    today = date.today()
+    start_key = today.month * 100 + today.day
+    stmt = select(Contact).filter(Contact.user_id == user.id)
+    if days >= 365:
+        stmt = stmt.filter(Contact.birthday_key.isnot(None))
     else:
-        return None
+        end = today + timedelta(days=days)
+        end_key = end.month * 100 + end.day
+        if end_key == 228 and not calendar.isleap(end.year):
+            end_key = 229
+        if start_key <= end_key:
+            stmt = stmt.filter(Contact.birthday_key.between(start_key, end_key))
+        else:
+            stmt = stmt.filter(or_(Contact.birthday_key >= start_key, Contact.birthday_key <= end_key))
+    stmt = stmt.order_by(Contact.birthday_key < start_key, Contact.birthday_key)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
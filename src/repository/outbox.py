@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox
+
+
+async def add_email(kind: str, recipient: str, payload: dict, db: AsyncSession, commit: bool = True) -> EmailOutbox:
+    """
+    Queues an email in the outbox.
+
+    :param kind: The kind of email, e.g. ``confirm_email`` or ``reset_password``.
+    :type kind: str
+    :param recipient: The email address to send to.
+    :type recipient: str
+    :param payload: The variables of the email template.
+    :type payload: dict
+    :param db: The database session.
+    :type db: AsyncSession
+    :param commit: Whether to commit right away. Without it the email is committed together with the next change
+        made through the same session, or not at all.
+    :type commit: bool
+    :return: The queued email.
+    :rtype: EmailOutbox
+    """
+    email = EmailOutbox(kind=kind, recipient=recipient, payload=payload)
+    db.add(email)
+    if commit:
+        await db.commit()
+    return email
+
+
+async def claim_emails(limit: int, lease: float, db: AsyncSession) -> list[EmailOutbox]:
+    """
+    Claims a batch of emails that are due, skipping the ones other workers are claiming at the same time.
+
+    The claimed emails are held back for ``lease`` seconds and the claim is committed right away, so no row stays
+    locked while the batch is sent. A batch that is never finished with :func:`record_attempts`, e.g. because the
+    worker crashed, is claimed again once the lease runs out.
+
+    :param limit: The maximum number of emails to claim.
+    :type limit: int
+    :param lease: How long the claimed emails are held back, in seconds.
+    :type lease: float
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The claimed emails, oldest first.
+    :rtype: list[EmailOutbox]
+    """
+    now = datetime.now()
+    stmt = select(EmailOutbox).filter(
+        EmailOutbox.status == "pending",
+        or_(EmailOutbox.retry_at.is_(None), EmailOutbox.retry_at <= now),
+    ).order_by(EmailOutbox.id).limit(limit).with_for_update(skip_locked=True)
+    emails = list((await db.execute(stmt)).scalars().all())
+    for email in emails:
+        email.retry_at = now + timedelta(seconds=lease)
+    await db.commit()
+    return emails
+
+
+async def record_attempts(attempts: list[tuple[EmailOutbox, str | None, datetime | None]], db: AsyncSession):
+    """
+    Records the outcome of sending a claimed batch.
+
+    :param attempts: Every email with its error (None if it was sent) and the time to retry it at (None if it
+        should not be retried).
+    :type attempts: list[tuple[EmailOutbox, str | None, datetime | None]]
+    :param db: The database session.
+    :type db: AsyncSession
+    """
+    now = datetime.now()
+    for email, error, retry_at in attempts:
+        email.attempts += 1
+        email.last_error = error
+        email.retry_at = retry_at
+        if error is None:
+            email.status = "sent"
+            email.sent_at = now
+        elif retry_at is None:
+            email.status = "failed"
+    await db.commit()
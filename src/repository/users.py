@@ -1,38 +1,42 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas import RequestPassword
 from src.database.models import User
+from src.services.cache import user_cache
 
 
-async def get_user_by_email_for_confirm(contact_email: str, db: Session):
+async def get_user_by_email_for_confirm(contact_email: str, db: AsyncSession):
     """
     Retrieves a user by email for the purpose of email confirmation from the database.
 
     :param contact_email: The email address of the user to retrieve.
     :type contact_email: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The user with the specified email address for email confirmation, or None if not found.
     :rtype: User | None
     """
-    return db.query(User).filter(User.email == contact_email).first()
+    user = await db.execute(select(User).filter(User.email == contact_email))
+    return user.scalar_one_or_none()
 
 
-async def confirmed_email(email: str, db: Session):
+async def confirmed_email(email: str, db: AsyncSession):
     """
     Confirms the email address for a user in the database.
 
     :param email: The email address of the user to confirm.
     :type email: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     """
     user = await get_user_by_email_for_confirm(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
 
-async def update_avatar(email: str, url: str, db: Session):
+async def update_avatar(email: str, url: str, db: AsyncSession):
     """
     Updates the avatar for a user in the database.
 
@@ -41,17 +45,18 @@ async def update_avatar(email: str, url: str, db: Session):
     :param url: The new avatar URL to set.
     :type url: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The updated user.
     :rtype: User
     """
     user = await get_user_by_email_for_confirm(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
 
 
-async def update_password(email: str, password: RequestPassword, db: Session):
+async def update_password(email: str, password: RequestPassword, db: AsyncSession):
     """
     Updates the password for a user in the database.
 
@@ -60,11 +65,12 @@ async def update_password(email: str, password: RequestPassword, db: Session):
     :param password: The new password to set.
     :type password: RequestPassword
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The updated user.
     :rtype: User
     """
     user = await get_user_by_email_for_confirm(email, db)
     user.password = password
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
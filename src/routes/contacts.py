@@ -1,82 +1,161 @@
-from typing import List
+import time
+from datetime import date
+from typing import List, Literal
 
-from fastapi import APIRouter, HTTPException, Depends, status, Query, Path
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Path, UploadFile, File, Header
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
-from src.schemas import ContactResponse, ContactModel
+from src.schemas import ContactResponse, ContactModel, ContactFilter, ContactQueryResponse, ImportResponse
 from src.repository import contacts as repository_contacts
 from src.services.auth import auth_service
+from src.services.cache import contacts_cache
+from src.services.etag import contacts_etag, etag_matches
+from src.services.rate_limit import RateLimiter
+from src.services.pagination import decode_cursor, next_cursor
+from src.services.importer import detect_format, import_contacts
+from src.services.exporter import EXPORT_MEDIA_TYPES, export_contacts
 from src.database.models import User
 
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
+contact_adapter = TypeAdapter(ContactResponse)
+contact_list_adapter = TypeAdapter(List[ContactResponse])
 
 
 @router.get("/", response_model=List[ContactResponse],
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contacts(limit: int = Query(default=10, le=50), skip: int = 0, db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_contacts(limit: int = Query(default=10, le=50), skip: int = 0,
+                       sort: Literal["id", "name", "surname", "birthday"] = "id", after: str = None,
+                       if_none_match: str = Header(default=None), db: AsyncSession = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
-    contacts = await repository_contacts.get_contacts(limit, skip, current_user, db)
-    return contacts
+    after_key = decode_cursor(after, sort) if after else None
+
+    def cursor_header(contacts):
+        cursor = next_cursor(contacts, limit, sort, repository_contacts.SORT_COLUMNS[sort].key)
+        return {"X-Next-Cursor": cursor} if cursor else {}
+
+    params = {"limit": limit, "skip": skip, "sort": sort, "after": after}
+    etag = await contacts_etag(current_user, db, "get_contacts", params)
+    return await contacts_cache.cached(
+        current_user.id, "get_contacts", params,
+        lambda: repository_contacts.get_contacts(limit, skip, current_user, db, sort, after_key),
+        contact_list_adapter, cursor_header, etag, etag_matches(if_none_match, etag))
 
 
 @router.get("/search_by_email", response_model=ContactResponse,
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contact_by_email(contact_email: str, db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_contact_by_email(contact_email: str, db: AsyncSession = Depends(get_db),
                                current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_contact_by_email(contact_email, current_user, db)
-    return contact
+    return await contacts_cache.cached(
+        current_user.id, "get_contact_by_email", {"contact_email": contact_email},
+        lambda: repository_contacts.get_contact_by_email(contact_email, current_user, db), contact_adapter)
 
 
 @router.get("/search_by_name", response_model=List[ContactResponse],
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contact_by_name(contact_name: str, db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_contact_by_name(contact_name: str, db: AsyncSession = Depends(get_db),
                               current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_contact_by_name(contact_name, current_user, db)
-    return contact
+    return await contacts_cache.cached(
+        current_user.id, "get_contact_by_name", {"contact_name": contact_name},
+        lambda: repository_contacts.get_contact_by_name(contact_name, current_user, db), contact_list_adapter)
 
 
 @router.get("/search_by_surname", response_model=List[ContactResponse],
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contact_by_surname(contact_surname: str, db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_contact_by_surname(contact_surname: str, db: AsyncSession = Depends(get_db),
                                  current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_contact_by_surname(contact_surname, current_user, db)
-    return contact
+    return await contacts_cache.cached(
+        current_user.id, "get_contact_by_surname", {"contact_surname": contact_surname},
+        lambda: repository_contacts.get_contact_by_surname(contact_surname, current_user, db), contact_list_adapter)
+
+
+@router.get("/query", response_model=ContactQueryResponse,
+            dependencies=[Depends(RateLimiter("read"))])
+async def query_contacts(filters: ContactFilter = Depends(), limit: int = Query(default=10, le=50),
+                         sort: Literal["id", "name", "surname", "birthday"] = "id", after: str = None,
+                         db: AsyncSession = Depends(get_db),
+                         current_user: User = Depends(auth_service.get_current_user)):
+    after_key = decode_cursor(after, sort) if after else None
+    start = time.perf_counter()
+    contacts = await repository_contacts.query_contacts(filters, limit, current_user, db, sort, after_key)
+    query_time_ms = (time.perf_counter() - start) * 1000
+    return {"items": contacts,
+            "next_cursor": next_cursor(contacts, limit, sort, repository_contacts.SORT_COLUMNS[sort].key),
+            "query_time_ms": round(query_time_ms, 3)}
+
+
+@router.get("/search", response_model=List[ContactResponse],
+            dependencies=[Depends(RateLimiter("read"))])
+async def search_contacts(q: str = Query(min_length=1, max_length=100), limit: int = Query(default=20, le=50),
+                          db: AsyncSession = Depends(get_db),
+                          current_user: User = Depends(auth_service.get_current_user)):
+    return await contacts_cache.cached(
+        current_user.id, "search_contacts", {"q": q, "limit": limit},
+        lambda: repository_contacts.search_contacts(q, current_user, db, limit), contact_list_adapter)
 
 
 @router.get("/birthday", response_model=List[ContactResponse],
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_birthday_contact(db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_birthday_contact(days: int = Query(default=7, ge=0, le=365), if_none_match: str = Header(default=None),
+                               db: AsyncSession = Depends(get_db),
                                current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_birthday_contact(current_user, db)
-    return contact
+    # The window moves with the date, so the date is part of the key and of the ETag
+    params = {"days": days, "today": date.today()}
+    etag = await contacts_etag(current_user, db, "get_birthday_contact", params)
+    return await contacts_cache.cached(
+        current_user.id, "get_birthday_contact", params,
+        lambda: repository_contacts.get_birthday_contact(current_user, db, days), contact_list_adapter,
+        etag=etag, not_modified=etag_matches(if_none_match, etag))
+
+
+@router.get("/export", response_class=StreamingResponse,
+            dependencies=[Depends(RateLimiter("write"))])
+async def export_contacts_file(file_format: Literal["csv", "ndjson"] = "ndjson", db: AsyncSession = Depends(get_db),
+                               current_user: User = Depends(auth_service.get_current_user)):
+    return StreamingResponse(export_contacts(file_format, current_user, db),
+                             media_type=EXPORT_MEDIA_TYPES[file_format],
+                             headers={"Content-Disposition": f'attachment; filename="contacts.{file_format}"'})
 
 
 @router.get("/{contact_id}", response_model=ContactResponse,
-            dependencies=[Depends(RateLimiter(times=2, seconds=5))])
-async def get_contact_by_id(contact_id: int = Path(ge=1), db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("read"))])
+async def get_contact_by_id(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
                             current_user: User = Depends(auth_service.get_current_user)):
-    contact = await repository_contacts.get_contact_by_id(contact_id, current_user, db)
-    return contact
+    return await contacts_cache.cached(
+        current_user.id, "get_contact_by_id", {"contact_id": contact_id},
+        lambda: repository_contacts.get_contact_by_id(contact_id, current_user, db), contact_adapter)
 
 
 @router.post("/", response_model=ContactResponse, status_code=status.HTTP_201_CREATED,
-             dependencies=[Depends(RateLimiter(times=1, seconds=5))])
-async def create_contact(body: ContactModel, db: Session = Depends(get_db),
+             dependencies=[Depends(RateLimiter("write"))])
+async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     contact = await repository_contacts.get_contact_by_phone(body.phone_number, current_user, db)
-    print(contact)
     if contact:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with this number already exists!")
     contact = await repository_contacts.create_contact(body, current_user, db)
     return contact
 
 
+@router.post("/import", response_model=ImportResponse,
+             dependencies=[Depends(RateLimiter("write"))])
+async def import_contacts_file(file: UploadFile = File(), file_format: Literal["csv", "ndjson"] = Query(None),
+                               db: AsyncSession = Depends(get_db),
+                               current_user: User = Depends(auth_service.get_current_user)):
+    file_format = file_format or detect_format(file.filename, file.content_type)
+    if file_format is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Unknown file format, use CSV or NDJSON")
+    report = await import_contacts(file.file, file_format, current_user, db)
+    return report
+
+
 @router.put("/{contact_id}", response_model=ContactResponse,
-            dependencies=[Depends(RateLimiter(times=1, seconds=5))])
-async def update_contact(body: ContactModel, contact_id: int = Path(ge=1), db: Session = Depends(get_db),
+            dependencies=[Depends(RateLimiter("write"))])
+async def update_contact(body: ContactModel, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     contact = await repository_contacts.update_contact(body, db, current_user, contact_id)
     if contact is None:
@@ -84,8 +163,8 @@ async def update_contact(body: ContactModel, contact_id: int = Path(ge=1), db: S
     return contact
 
 
-@router.delete("/{contact_id}", dependencies=[Depends(RateLimiter(times=1, seconds=5))])
-async def remove_contact(contact_id: int = Path(ge=1), db: Session = Depends(get_db),
+@router.delete("/{contact_id}", dependencies=[Depends(RateLimiter("write"))])
+async def remove_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
                          current_user: User = Depends(auth_service.get_current_user)):
     contact = await repository_contacts.remove_contact(contact_id, current_user, db)
     if contact is None:
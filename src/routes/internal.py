@@ -0,0 +1,81 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from src.database.db import engine
+from src.database.models import User
+from src.database.pool import get_pool_status
+from src.schemas import (PoolStatusResponse, CacheStatsResponse, ProfileResponse, MemoryStatusResponse,
+                         AllocationResponse, RouteMemoryResponse)
+from src.services.auth import get_current_admin
+from src.services.cache import user_cache, contacts_cache
+from src.services.memory import memory_tracker
+from src.services.profiling import profile_store
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/db_pool", response_model=PoolStatusResponse)
+async def get_db_pool_status(current_user: User = Depends(get_current_admin)):
+    return get_pool_status(engine.pool)
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats(current_user: User = Depends(get_current_admin)):
+    return {"user": user_cache.stats, "contacts": contacts_cache.stats}
+
+
+@router.get("/profiles", response_model=List[ProfileResponse])
+async def get_profiles(current_user: User = Depends(get_current_admin)):
+    return profile_store.list()
+
+
+@router.get("/profiles/{name}", response_class=FileResponse)
+async def get_profile(name: str, current_user: User = Depends(get_current_admin)):
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found!")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+
+def require_tracing():
+    if not memory_tracker.is_tracing():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Memory tracing is not started")
+
+
+@router.get("/memory", response_model=MemoryStatusResponse)
+async def get_memory_status(current_user: User = Depends(get_current_admin)):
+    return memory_tracker.status()
+
+
+@router.post("/memory/start", response_model=MemoryStatusResponse)
+async def start_memory_tracing(frames: int = Query(default=1, ge=1, le=100),
+                               current_user: User = Depends(get_current_admin)):
+    memory_tracker.start(frames)
+    return memory_tracker.status()
+
+
+@router.post("/memory/stop", response_model=MemoryStatusResponse)
+async def stop_memory_tracing(current_user: User = Depends(get_current_admin)):
+    memory_tracker.stop()
+    return memory_tracker.status()
+
+
+# Snapshots walk every traced block, so these run in the thread pool rather than on the event loop
+@router.post("/memory/baseline", response_model=MemoryStatusResponse, dependencies=[Depends(require_tracing)])
+def take_memory_baseline(current_user: User = Depends(get_current_admin)):
+    memory_tracker.take_baseline()
+    return memory_tracker.status()
+
+
+@router.get("/memory/top", response_model=List[AllocationResponse], dependencies=[Depends(require_tracing)])
+def get_top_allocations(limit: int = Query(default=20, ge=1, le=100),
+                        group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+                        current_user: User = Depends(get_current_admin)):
+    return memory_tracker.top(limit, group_by)
+
+
+@router.get("/memory/routes", response_model=List[RouteMemoryResponse])
+async def get_route_memory(current_user: User = Depends(get_current_admin)):
+    return memory_tracker.route_stats()
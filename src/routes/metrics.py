@@ -0,0 +1,79 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from src.conf.config import settings
+from src.database.db import engine
+from src.services.cache import user_cache, contacts_cache
+from src.services.metrics import request_metrics, format_metric, format_histogram
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    """
+    Renders the request, dependency, connection pool and cache metrics in the Prometheus text format.
+
+    :return: The exposition text.
+    :rtype: str
+    """
+    metrics = request_metrics
+    pool = engine.pool
+    lines = [
+        *format_metric("http_requests_total", "counter", "HTTP requests by route template and status.", [
+            ({"method": method, "route": route, "status": status}, count)
+            for (method, route, status), count in list(metrics.requests.items())
+        ]),
+        *format_metric("http_requests_in_progress", "gauge", "HTTP requests being served.", [
+            ({"method": method}, count) for method, count in list(metrics.in_progress.items())
+        ]),
+        *format_histogram("http_request_duration_seconds", "Time to serve HTTP requests.", [
+            ({"method": method, "route": route, "status": status}, histogram)
+            for (method, route, status), histogram in list(metrics.durations.items())
+        ]),
+        *format_histogram("http_response_size_bytes", "Size of HTTP response bodies.", [
+            ({"method": method, "route": route}, histogram)
+            for (method, route), histogram in list(metrics.sizes.items())
+        ]),
+        *format_histogram("dependency_duration_seconds", "Time spent in route dependencies.", [
+            ({"dependency": name}, histogram) for name, histogram in list(metrics.dependencies.items())
+        ]),
+        *format_metric("db_pool_connections", "gauge", "Database connections by state.", [
+            ({"state": "checked_out"}, pool.checkedout()),
+            ({"state": "checked_in"}, pool.checkedin()),
+            ({"state": "overflow"}, max(pool.overflow(), 0)),
+        ]),
+        *format_histogram("db_pool_checkout_wait_seconds", "Time waited for a database connection.", [
+            ({}, pool.checkout_wait),
+        ]),
+        *format_metric("cache_events_total", "counter", "Cache hits, misses and errors.", [
+            ({"cache": name, "event": event}, count)
+            for name, cache in (("user", user_cache), ("contacts", contacts_cache))
+            for event, count in list(cache.stats.items())
+        ]),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def verify_scrape_token(authorization: str = Header(default="")):
+    """
+    Lets through the requests that carry ``settings.metrics_token`` as a bearer token.
+
+    :param authorization: The value of the ``Authorization`` header.
+    :type authorization: str
+    :raises HTTPException: 401 if the token is missing or wrong, or no token is configured.
+    """
+    scheme, _, token = authorization.partition(" ")
+    if not (settings.metrics_token and scheme.lower() == "bearer"
+            and secrets.compare_digest(token.encode(), settings.metrics_token.encode())):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(verify_scrape_token)])
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,12 +1,11 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.database.models import User
 from src.repository import users as repository_users
 from src.services.auth import auth_service
+from src.services.images import save_avatar, InvalidImageError
 from src.conf.config import settings
 from src.schemas import UserResponse
 
@@ -21,17 +20,13 @@ async def read_users_me(current_user: User = Depends(auth_service.get_current_us
 @router.patch("/avatar", response_model=UserResponse)
 async def update_avatar_user(file: UploadFile = File(),
                              current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
-    cloudinary.config(
-        cloud_name=settings.cloudinary_name,
-        api_key=settings.cloudinary_api_key,
-        api_secret=settings.cloudinary_api_secret,
-        secure=True
-    )
-
-    r = cloudinary.uploader.upload(file.file, public_id=f"contact_photo/{current_user.email}", overwrite=True)
-    src_url = cloudinary.CloudinaryImage(f"contact_photo/{current_user.email}").build_url(width=250, height=250,
-                                                                                          crop='fill',
-                                                                                          version=r.get('version'))
+                             db: AsyncSession = Depends(get_db)):
+    data = await file.read(settings.avatar_max_size + 1)
+    if len(data) > settings.avatar_max_size:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+    try:
+        src_url = await save_avatar(data)
+    except InvalidImageError:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Invalid image")
     user = await repository_users.update_avatar(current_user.email, src_url, db)
     return user
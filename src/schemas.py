@@ -1,4 +1,6 @@
-from datetime import date
+from datetime import date, datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -17,6 +19,37 @@ class ContactResponse(ContactModel):
         orm_mode = True
 
 
+class ContactFilter(BaseModel):
+    first_name: Optional[str] = None
+    surname: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    birthday_from: Optional[date] = None
+    birthday_to: Optional[date] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+
+
+class ContactQueryResponse(BaseModel):
+    items: List[ContactResponse]
+    next_cursor: Optional[str] = None
+    query_time_ms: float
+
+
+class ImportRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class ImportResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    errors: List[ImportRowError]
+
+
 class UserModel(BaseModel):
     username: str = Field(min_length=3, max_length=20)
     email: EmailStr
@@ -45,3 +78,54 @@ class RequestEmail(BaseModel):
 
 class RequestPassword(BaseModel):
     password: str = Field(min_length=5, max_length=20)
+
+
+class HistogramResponse(BaseModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStatusResponse(BaseModel):
+    pool_size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkout_wait: HistogramResponse
+
+
+class CacheStatsResponse(BaseModel):
+    user: dict[str, int]
+    contacts: dict[str, int]
+
+
+class ProfileResponse(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
+
+
+class MemoryStatusResponse(BaseModel):
+    tracing: bool
+    traced_current: int
+    traced_peak: int
+    baseline: bool
+    max_rss: Optional[int]
+    overlapped_requests: int
+
+
+class AllocationResponse(BaseModel):
+    traceback: List[str]
+    size: int
+    size_diff: Optional[int]
+    count: int
+    count_diff: Optional[int]
+
+
+class RouteMemoryResponse(BaseModel):
+    method: str
+    route: str
+    requests: int
+    peak_mean: int
+    peak_max: int
+    retained_max: int
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import secrets
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+import redis.asyncio as redis
+from fastapi import Response, status
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+
+
+class LocalCache:
+    """
+    In-process LRU cache whose entries expire after a fixed number of seconds.
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated users keyed by email: an in-process LRU in front of Redis.
+
+    Only the fields needed to serve a request are cached, never the password hash or the refresh token.
+    The local level keeps entries for a few seconds only, because other workers cannot invalidate it.
+    """
+    fields = ("id", "username", "email", "avatar", "confirmed", "created_at")
+
+    def __init__(self, redis_client: redis.Redis, ttl: int, local_ttl: float, maxsize: int):
+        self.redis = redis_client
+        self.ttl = ttl
+        self._local = LocalCache(local_ttl, maxsize)
+        self.stats = Counter()
+
+    @staticmethod
+    def key(email: str) -> str:
+        return f"user:{email}"
+
+    def dumps(self, user: User) -> str:
+        data = {field: getattr(user, field) for field in self.fields}
+        if data["created_at"] is not None:
+            data["created_at"] = data["created_at"].isoformat()
+        return json.dumps(data, separators=(",", ":"))
+
+    @staticmethod
+    def loads(value: str | bytes) -> User:
+        data = json.loads(value)
+        if data["created_at"] is not None:
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return User(**data)
+
+    async def get(self, email: str) -> User | None:
+        """
+        Retrieves a cached user.
+
+        :param email: The email address of the user.
+        :type email: str
+        :return: A new detached user built from the cached fields, or None on a cache miss.
+        :rtype: User | None
+        """
+        value = self._local.get(email)
+        if value is not None:
+            self.stats["local_hits"] += 1
+            return self.loads(value)
+        try:
+            value = await self.redis.get(self.key(email))
+        except RedisError:
+            self.stats["errors"] += 1
+            return None
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        self._local.set(email, value)
+        return self.loads(value)
+
+    async def set(self, user: User):
+        """
+        Stores a user in both cache levels.
+
+        :param user: The user loaded from the database.
+        :type user: User
+        """
+        value = self.dumps(user)
+        self._local.set(user.email, value)
+        try:
+            await self.redis.set(self.key(user.email), value, ex=self.ttl)
+        except RedisError:
+            self.stats["errors"] += 1
+
+    async def invalidate(self, email: str):
+        """
+        Drops a user from both cache levels after it changed in the database.
+
+        :param email: The email address of the user.
+        :type email: str
+        """
+        self._local.pop(email)
+        try:
+            await self.redis.delete(self.key(email))
+        except RedisError:
+            self.stats["errors"] += 1
+
+    def clear(self):
+        """
+        Drops every entry of the in-process level.
+        """
+        self._local.clear()
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized responses keyed by user, route and parameters.
+
+    Every key includes a per-user version counter kept in Redis. Writes bump the counter instead of deleting keys,
+    so all cached responses of the user become unreachable at once and simply expire. A counter starts from a random
+    value, so one that Redis lost, e.g. to a restart or an eviction, does not repeat the versions (and ETags) of
+    the old one. The version is kept locally
+    for a few seconds only, which bounds how long other workers may serve a response older than a write. Without
+    Redis the cache is bypassed, since the version of the data cannot be known.
+    """
+
+    def __init__(self, redis_client: redis.Redis, prefix: str, ttl: int, local_ttl: float, maxsize: int):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self._versions = LocalCache(local_ttl, maxsize)
+        self._local = LocalCache(local_ttl, maxsize)
+        self.stats = Counter()
+
+    def version_key(self, user_id: int) -> str:
+        return f"{self.prefix}:version:{user_id}"
+
+    async def start_version(self, key: str):
+        await self.redis.set(key, secrets.randbits(48), nx=True)
+
+    async def version(self, user_id: int) -> int | None:
+        """
+        Retrieves the current version of a user's data.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: The version, or None if Redis is unreachable.
+        :rtype: int | None
+        """
+        version = self._versions.get(user_id)
+        if version is not None:
+            return version
+        key = self.version_key(user_id)
+        try:
+            version = await self.redis.get(key)
+            if version is None:
+                await self.start_version(key)
+                version = await self.redis.get(key)
+            version = int(version)
+        except RedisError:
+            self.stats["errors"] += 1
+            return None
+        self._versions.set(user_id, version)
+        return version
+
+    async def bump(self, user_id: int):
+        """
+        Invalidates every cached response of a user after their data changed.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        """
+        self._versions.pop(user_id)
+        key = self.version_key(user_id)
+        try:
+            await self.start_version(key)
+            version = await self.redis.incr(key)
+        except RedisError:
+            self.stats["errors"] += 1
+            return
+        self._versions.set(user_id, int(version))
+
+    async def key(self, user_id: int, route: str, params: dict) -> str | None:
+        version = await self.version(user_id)
+        if version is None:
+            return None
+        digest = hashlib.blake2b(json.dumps(params, sort_keys=True, default=str).encode(), digest_size=12)
+        return f"{self.prefix}:{user_id}:{version}:{route}:{digest.hexdigest()}"
+
+    async def get(self, key: str) -> tuple[bytes, dict] | None:
+        """
+        Retrieves a cached response.
+
+        :param key: The key made by :meth:`key`.
+        :type key: str
+        :return: The body and the headers of the response, or None on a cache miss.
+        :rtype: tuple[bytes, dict] | None
+        """
+        value = self._local.get(key)
+        if value is not None:
+            self.stats["local_hits"] += 1
+            return value
+        try:
+            value = await self.redis.get(key)
+        except RedisError:
+            self.stats["errors"] += 1
+            return None
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        headers, body = value.split(b"\n", 1)
+        value = body, json.loads(headers)
+        self._local.set(key, value)
+        return value
+
+    async def set(self, key: str, body: bytes, headers: dict):
+        """
+        Stores a response in both cache levels.
+
+        :param key: The key made by :meth:`key`.
+        :type key: str
+        :param body: The serialized body.
+        :type body: bytes
+        :param headers: The headers to send along with the body.
+        :type headers: dict
+        """
+        self._local.set(key, (body, headers))
+        try:
+            await self.redis.set(key, json.dumps(headers).encode() + b"\n" + body, ex=self.ttl)
+        except RedisError:
+            self.stats["errors"] += 1
+
+    async def cached(self, user_id: int, route: str, params: dict, load: Callable[[], Awaitable[Any]],
+                     adapter: TypeAdapter, headers: Callable[[Any], dict] = None, etag: str = None,
+                     not_modified: bool = False) -> Response | None:
+        """
+        Returns a cached response, or loads, serializes and caches it.
+
+        With ``not_modified`` set a bodiless ``304`` is returned right away, before anything is loaded.
+
+        :param user_id: The ID of the user the response belongs to.
+        :type user_id: int
+        :param route: The name of the route.
+        :type route: str
+        :param params: The parameters the response depends on.
+        :type params: dict
+        :param load: Loads the data from the database on a cache miss.
+        :type load: Callable[[], Awaitable[Any]]
+        :param adapter: Validates and serializes the loaded data, usually the response model of the route.
+        :type adapter: TypeAdapter
+        :param headers: Builds extra headers from the loaded data.
+        :type headers: Callable[[Any], dict]
+        :param etag: The ETag to send with the response.
+        :type etag: str
+        :param not_modified: Whether the client already has the representation matching ``etag``.
+        :type not_modified: bool
+        :return: The JSON response, or None if nothing was found.
+        :rtype: Response | None
+        """
+        etag_headers = {"ETag": etag} if etag else {}
+        if etag and not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers)
+        key = await self.key(user_id, route, params)
+        if key is not None:
+            entry = await self.get(key)
+            if entry is not None:
+                body, extra_headers = entry
+                return Response(content=body, media_type="application/json", headers={**extra_headers,
+                                                                                          **etag_headers})
+        data = await load()
+        if data is None:
+            return None
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        extra_headers = headers(data) if headers else {}
+        if key is not None:
+            await self.set(key, body, extra_headers)
+        return Response(content=body, media_type="application/json", headers={**extra_headers, **etag_headers})
+
+    def clear(self):
+        """
+        Drops every entry of the in-process level.
+        """
+        self._versions.clear()
+        self._local.clear()
+
+
+redis_client = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, socket_timeout=1,
+                           socket_connect_timeout=1)
+
+user_cache = UserCache(
+    redis_client,
+    ttl=settings.user_cache_ttl,
+    local_ttl=settings.user_cache_local_ttl,
+    maxsize=settings.user_cache_size,
+)
+
+contacts_cache = ResponseCache(
+    redis_client,
+    prefix="contacts",
+    ttl=settings.response_cache_ttl,
+    local_ttl=settings.response_cache_local_ttl,
+    maxsize=settings.response_cache_size,
+)
@@ -0,0 +1,64 @@
+import hashlib
+import json
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.services.cache import contacts_cache
+
+
+def make_etag(*parts) -> str:
+    """
+    Builds a strong ETag from the values a response depends on.
+
+    :param parts: JSON-serializable values, e.g. the user ID, the data version, the route and its parameters.
+    :return: The quoted ETag.
+    :rtype: str
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":")).encode()
+    return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checks an ``If-None-Match`` header against an ETag, using the weak comparison the header calls for.
+
+    :param if_none_match: The value of the ``If-None-Match`` request header.
+    :type if_none_match: str | None
+    :param etag: The current ETag of the resource.
+    :type etag: str
+    :return: True if the client already has the current representation.
+    :rtype: bool
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def contacts_etag(user: User, db: AsyncSession, route: str, params: dict) -> str:
+    """
+    Computes the ETag of a contacts response without loading or serializing any contact.
+
+    The per-user version of the response cache is used when Redis is reachable, otherwise the number of contacts
+    and their latest ``updated_at``.
+
+    :param user: The user the response belongs to.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :param route: The name of the route.
+    :type route: str
+    :param params: The parameters the response depends on.
+    :type params: dict
+    :return: The quoted ETag.
+    :rtype: str
+    """
+    version = await contacts_cache.version(user.id)
+    if version is None:
+        version = await repository_contacts.get_contacts_version(user, db)
+    return make_etag(user.id, version, route, params)
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+async def export_contacts(fmt: str, user: User, db: AsyncSession) -> AsyncIterator[str]:
+    """
+    Serializes all contacts of a user chunk by chunk, one chunk per cursor batch.
+
+    The body of a streaming response is sent after ``get_db`` has already closed its session, so the session is
+    opened again here and closed once the export is finished.
+
+    :param fmt: ``csv`` or ``ndjson``.
+    :type fmt: str
+    :param user: The user whose contacts to export.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: An async iterator over chunks of the serialized file.
+    :rtype: AsyncIterator[str]
+    """
+    fields = [column.key for column in repository_contacts.EXPORT_COLUMNS]
+    async with db:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fields)
+            writer.writeheader()
+            yield buffer.getvalue()
+        async for rows in repository_contacts.stream_contacts(user, db, settings.export_batch_size):
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row), default=str) + "\n" for row in rows)
@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from src.conf.config import settings
+from src.services.storage import storage
+
+IMAGE_FORMATS = {
+    "webp": ("WEBP", {"method": 4}),
+    "jpeg": ("JPEG", {"optimize": True, "progressive": True}),
+}
+
+# Decoding and resizing hold the GIL, so they run in other processes
+image_executor = ProcessPoolExecutor(max_workers=settings.image_workers)
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+def process_image(data: bytes, sizes: list[int], fmt: str, quality: int) -> list[bytes]:
+    """
+    Crops an image to squares of the given sizes and re-encodes them.
+
+    :param data: The uploaded image.
+    :type data: bytes
+    :param sizes: The side lengths of the squares, in pixels.
+    :type sizes: list[int]
+    :param fmt: ``webp`` or ``jpeg``.
+    :type fmt: str
+    :param quality: The encoder quality, from 1 to 100.
+    :type quality: int
+    :return: The encoded squares, in the order of ``sizes``.
+    :rtype: list[bytes]
+    :raises InvalidImageError: If the data is not an image Pillow can decode.
+    """
+    encoder, options = IMAGE_FORMATS[fmt]
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEGs are decoded at a reduced scale when they are much larger than the biggest square
+            image.draft("RGB", (max(sizes) * 2, max(sizes) * 2))
+            image = ImageOps.exif_transpose(image)
+            alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            image = image.convert("RGBA" if alpha and fmt == "webp" else "RGB")
+            results = []
+            for size in sizes:
+                square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+                out = io.BytesIO()
+                square.save(out, encoder, quality=quality, **options)
+                results.append(out.getvalue())
+            return results
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as err:
+        raise InvalidImageError(str(err)) from None
+
+
+async def save_avatar(data: bytes) -> str:
+    """
+    Stores the thumbnails of an uploaded avatar under the hash of its content.
+
+    An image uploaded before is neither processed nor stored again, whoever uploaded it.
+
+    :param data: The uploaded image.
+    :type data: bytes
+    :return: The URL of the largest thumbnail.
+    :rtype: str
+    :raises InvalidImageError: If the data is not an image.
+    """
+    sizes, fmt = sorted(settings.avatar_sizes, reverse=True), settings.avatar_format
+    digest = hashlib.sha256(data).hexdigest()
+    keys = [f"avatars/{digest}/{size}.{fmt}" for size in sizes]
+    # The largest thumbnail is stored last, so once it exists the smaller ones do too
+    if await storage.exists(keys[0]):
+        return storage.url(keys[0])
+    loop = asyncio.get_running_loop()
+    images = await loop.run_in_executor(image_executor, process_image, data, sizes, fmt, settings.avatar_quality)
+    await asyncio.gather(*(storage.save(key, io.BytesIO(image)) for key, image in zip(keys[1:], images[1:])))
+    return await storage.save(keys[0], io.BytesIO(images[0]))
@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas import ContactModel
+
+
+def detect_format(filename: str | None, content_type: str | None) -> str | None:
+    """
+    Guesses the format of an uploaded file from its name and content type.
+
+    :param filename: The name of the uploaded file.
+    :type filename: str | None
+    :param content_type: The content type of the uploaded file.
+    :type content_type: str | None
+    :return: ``csv``, ``ndjson`` or None if the format is unknown.
+    :rtype: str | None
+    """
+    filename = (filename or "").lower()
+    content_type = content_type or ""
+    if filename.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if filename.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def iter_rows(file: BinaryIO, fmt: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """
+    Reads an uploaded file row by row without loading it into memory.
+
+    A malformed CSV row is reported and skipped. After ``settings.import_max_errors`` of them the file is taken for
+    garbage and the rest of it is not read.
+
+    :param file: The uploaded file.
+    :type file: BinaryIO
+    :param fmt: ``csv`` or ``ndjson``.
+    :type fmt: str
+    :return: The row number, the parsed row (or None) and the parse error (or None) for every row.
+    :rtype: Iterator[tuple[int, dict | None, str | None]]
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            number, invalid = 0, 0
+            while True:
+                number += 1
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    break
+                except csv.Error as err:
+                    invalid += 1
+                    if invalid < settings.import_max_errors:
+                        yield number, None, f"Invalid CSV: {err}"
+                        continue
+                    yield number, None, f"Invalid CSV: {err}. Too many invalid rows, the rest is skipped"
+                    break
+                yield number, row, None
+        else:
+            number = 0
+            for line in text:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as err:
+                    yield number, None, f"Invalid JSON: {err.msg}"
+                    continue
+                if isinstance(row, dict):
+                    yield number, row, None
+                else:
+                    yield number, None, "Row is not a JSON object"
+    except UnicodeDecodeError:
+        yield 0, None, "File is not valid UTF-8"
+    finally:
+        text.detach()
+
+
+async def import_contacts(file: BinaryIO, fmt: str, user: User, db: AsyncSession) -> dict:
+    """
+    Validates the rows of an uploaded file with ``ContactModel`` and inserts them in batches.
+
+    :param file: The uploaded file.
+    :type file: BinaryIO
+    :param fmt: ``csv`` or ``ndjson``.
+    :type fmt: str
+    :param user: The user for whom to import the contacts.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The numbers of created, duplicate and failed rows and the per-row errors.
+    :rtype: dict
+    """
+    report = {"created": 0, "duplicates": 0, "failed": 0, "errors": []}
+
+    def add_error(number: int, detail: str):
+        if len(report["errors"]) < settings.import_max_errors:
+            report["errors"].append({"row": number, "detail": detail})
+
+    async def flush(batch: list[tuple[int, ContactModel]]):
+        created = await repository_contacts.create_contacts([body for _, body in batch], user, db)
+        for number, body in batch:
+            if body.phone_number in created:
+                report["created"] += 1
+            else:
+                report["duplicates"] += 1
+                add_error(number, "Contact with this number or email already exists!")
+
+    batch = []
+    phones, emails = set(), set()
+    for number, row, error in iter_rows(file, fmt):
+        if error is None:
+            try:
+                body = ContactModel.model_validate(row)
+            except ValidationError as err:
+                error = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in err.errors())
+        if error is not None:
+            report["failed"] += 1
+            add_error(number, error)
+            continue
+        # ON CONFLICT cannot tell which of two equal rows in one statement was skipped, so drop the repeat here
+        if body.phone_number in phones or body.email in emails:
+            report["duplicates"] += 1
+            add_error(number, "Contact with this number or email already exists!")
+            continue
+        phones.add(body.phone_number)
+        emails.add(body.email)
+        batch.append((number, body))
+        if len(batch) >= settings.import_batch_size:
+            await flush(batch)
+            batch, phones, emails = [], set(), set()
+    await flush(batch)
+    return report
@@ -0,0 +1,141 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from email.message import Message
+
+from aiosmtplib import SMTP, SMTPException, SMTPRecipientsRefused, SMTPResponseException
+from fastapi_mail import ConnectionConfig
+
+
+class SMTPPool:
+    """
+    Small pool of authenticated SMTP connections that are kept open and reused across messages.
+
+    The size of the pool bounds how many messages are sent at the same time. A connection that failed is closed
+    instead of being returned, and a new one is opened on the next checkout.
+    """
+
+    def __init__(self, conf: ConnectionConfig, size: int):
+        self.conf = conf
+        self.size = size
+        self._idle: list[SMTP] = []
+        self._semaphore = asyncio.Semaphore(size)
+        self.stats = Counter()
+
+    async def _connect(self) -> SMTP:
+        client = SMTP(
+            hostname=self.conf.MAIL_SERVER,
+            port=self.conf.MAIL_PORT,
+            username=self.conf.MAIL_USERNAME if self.conf.USE_CREDENTIALS else None,
+            password=self.conf.MAIL_PASSWORD.get_secret_value() if self.conf.USE_CREDENTIALS else None,
+            use_tls=self.conf.MAIL_SSL_TLS,
+            start_tls=self.conf.MAIL_STARTTLS,
+            validate_certs=self.conf.VALIDATE_CERTS,
+            timeout=self.conf.TIMEOUT,
+        )
+        await client.connect()
+        self.stats["connections"] += 1
+        return client
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Checks out an open connection, connecting and logging in only if no idle one is left.
+
+        :return: The SMTP client, returned to the pool when the block exits without an error.
+        :rtype: SMTP
+        """
+        async with self._semaphore:
+            client = None
+            while self._idle and client is None:
+                client = self._idle.pop()
+                if not client.is_connected:
+                    client = None
+            if client is None:
+                client = await self._connect()
+            try:
+                yield client
+            except BaseException:
+                client.close()
+                raise
+            self._idle.append(client)
+
+    async def close(self):
+        """
+        Politely closes every idle connection.
+        """
+        idle, self._idle = self._idle, []
+        for client in idle:
+            try:
+                await client.quit()
+            except SMTPException:
+                client.close()
+
+
+def is_permanent(err: Exception) -> bool:
+    """
+    Tells whether retrying a failed message is pointless, e.g. because the mailbox does not exist.
+
+    :param err: The error raised while sending.
+    :type err: Exception
+    :return: True for permanent (5xx) failures.
+    :rtype: bool
+    """
+    if isinstance(err, SMTPRecipientsRefused):
+        return True
+    return isinstance(err, SMTPResponseException) and err.code >= 500
+
+
+class MailSender:
+    """
+    Long-lived sender that delivers messages through an :class:`SMTPPool`.
+
+    Batches are sent concurrently over the pooled connections. Temporary failures are retried with exponential
+    backoff, up to ``max_retries`` times.
+    """
+
+    def __init__(self, pool: SMTPPool, max_retries: int, retry_backoff: float):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = Counter()
+
+    async def send(self, message: Message):
+        """
+        Sends a single message, retrying temporary failures.
+
+        :param message: The message to send.
+        :type message: Message
+        :raises SMTPException: If the message could not be delivered.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.pool.connection() as client:
+                    await client.send_message(message)
+            except (SMTPException, OSError) as err:
+                if attempt == self.max_retries or is_permanent(err):
+                    self.stats["failed"] += 1
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            else:
+                self.stats["sent"] += 1
+                return
+
+    async def send_many(self, messages: list[Message]) -> list[Exception | None]:
+        """
+        Sends a batch of messages concurrently, as far as the pool allows.
+
+        :param messages: The messages to send.
+        :type messages: list[Message]
+        :return: The error of every message, or None if it was delivered.
+        :rtype: list[Exception | None]
+        """
+        results = await asyncio.gather(*(self.send(message) for message in messages), return_exceptions=True)
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    async def close(self):
+        """
+        Closes the pooled connections.
+        """
+        await self.pool.close()
@@ -0,0 +1,200 @@
+import linecache
+import tracemalloc
+from collections import defaultdict
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.services.metrics import route_template
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Allocations made by the tracing and the import machinery say nothing about the application
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class RouteMemory:
+    __slots__ = ("requests", "peak_total", "peak_max", "retained_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.peak_total = 0
+        self.peak_max = 0
+        self.retained_max = 0
+
+
+class MemoryTracker:
+    """
+    ``tracemalloc`` snapshots diffed against a baseline, and the peak memory of requests per route.
+
+    Tracing slows allocations down noticeably, so it is off until started and meant for investigations.
+
+    The peak of a request is how far the traced memory rose above its level when the request started. Python only
+    keeps one peak for the whole process, so a request is measured only if no other one ran at the same time.
+    """
+
+    def __init__(self):
+        self.baseline = None
+        self.routes = defaultdict(RouteMemory)
+        self.overlapped = 0
+        self._in_flight = 0
+        self._started = 0
+
+    @staticmethod
+    def is_tracing() -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        """
+        Starts tracing allocations, unless they are traced already.
+
+        :param frames: The number of stack frames stored per allocation, more give longer tracebacks but cost memory.
+        :type frames: int
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        """
+        Stops tracing, which frees the traces, the baseline and the route statistics.
+        """
+        tracemalloc.stop()
+        self.baseline = None
+        self.routes.clear()
+        self.overlapped = 0
+
+    def status(self) -> dict:
+        """
+        Reports the traced and resident memory of the process.
+
+        :return: Whether allocations are traced, the traced memory now and at its peak, whether there is a
+            baseline, the peak resident set size, all sizes in bytes, and the requests left out of the route
+            statistics because they overlapped.
+        :rtype: dict
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        max_rss = None
+        if resource is not None:
+            # Kilobytes on Linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_current": current,
+            "traced_peak": peak,
+            "baseline": self.baseline is not None,
+            "max_rss": max_rss,
+            "overlapped_requests": self.overlapped,
+        }
+
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def take_baseline(self):
+        """
+        Takes the snapshot that later ones are compared with.
+
+        :raises RuntimeError: If allocations are not traced.
+        """
+        self.baseline = self.take_snapshot()
+
+    def top(self, limit: int = 20, group_by: str = "lineno") -> list[dict]:
+        """
+        Finds the code that holds the most memory, or that gained the most since the baseline if there is one.
+
+        :param limit: The number of allocation sites to return.
+        :type limit: int
+        :param group_by: ``lineno``, ``filename`` or ``traceback``.
+        :type group_by: str
+        :return: The location, size and number of blocks of every site, with their change since the baseline.
+        :rtype: list[dict]
+        :raises RuntimeError: If allocations are not traced.
+        """
+        snapshot = self.take_snapshot()
+        if self.baseline is not None:
+            stats = snapshot.compare_to(self.baseline, group_by)
+        else:
+            stats = snapshot.statistics(group_by)
+        return [{
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size": stat.size,
+            "size_diff": getattr(stat, "size_diff", None),
+            "count": stat.count,
+            "count_diff": getattr(stat, "count_diff", None),
+        } for stat in stats[:limit]]
+
+    def route_stats(self) -> list[dict]:
+        """
+        Summarizes the peak memory of the measured requests per route, highest peak first.
+
+        :return: The method, route, number of measured requests, mean and max peak, and the most memory a request
+            left allocated, in bytes.
+        :rtype: list[dict]
+        """
+        stats = [{
+            "method": method,
+            "route": route,
+            "requests": memory.requests,
+            "peak_mean": memory.peak_total // memory.requests,
+            "peak_max": memory.peak_max,
+            "retained_max": memory.retained_max,
+        } for (method, route), memory in self.routes.items()]
+        return sorted(stats, key=lambda stat: stat["peak_max"], reverse=True)
+
+    def request_started(self) -> tuple[int, int] | None:
+        """
+        Marks the start of a request.
+
+        :return: The number of the request and its traced memory, or None if it cannot be measured.
+        :rtype: tuple[int, int] | None
+        """
+        self._started += 1
+        self._in_flight += 1
+        if self._in_flight > 1:
+            return None
+        tracemalloc.reset_peak()
+        return self._started, tracemalloc.get_traced_memory()[0]
+
+    def request_finished(self, method: str, route: str, start: tuple[int, int] | None):
+        self._in_flight -= 1
+        if not tracemalloc.is_tracing():
+            return
+        if start is None or self._started != start[0]:
+            self.overlapped += 1
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        memory = self.routes[(method, route)]
+        memory.requests += 1
+        memory.peak_total += peak - start[1]
+        memory.peak_max = max(memory.peak_max, peak - start[1])
+        memory.retained_max = max(memory.retained_max, current - start[1])
+
+
+class MemoryMiddleware:
+    """
+    ASGI middleware that measures the peak memory of requests in a :class:`MemoryTracker` while tracing is on.
+    """
+
+    def __init__(self, app: ASGIApp, tracker: MemoryTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not tracemalloc.is_tracing():
+            return await self.app(scope, receive, send)
+        start = self.tracker.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.tracker.request_finished(scope["method"], route_template(scope), start)
+
+
+memory_tracker = MemoryTracker()
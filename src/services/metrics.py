@@ -0,0 +1,260 @@
+import inspect
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import asynccontextmanager
+from functools import wraps
+from threading import Lock
+from typing import Callable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A cumulative histogram of observed values, in the same shape Prometheus uses.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        """
+        Records one observed value.
+
+        :param value: The value to record, e.g. a duration in seconds.
+        :type value: float
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current state of the histogram.
+
+        :return: The cumulative count for every bucket upper bound, the total count and the sum of the values.
+        :rtype: dict
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        cumulative += counts[-1]
+        buckets["+Inf"] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class RequestMetrics:
+    """
+    Request counts, latencies and response sizes per route template and status, and the time spent in dependencies.
+
+    Routes are labelled by their template, e.g. ``/api/contacts/{contact_id}``, so the number of series stays bounded
+    whatever paths clients request.
+    """
+
+    def __init__(self, latency_buckets: tuple = DEFAULT_BUCKETS, size_buckets: tuple = SIZE_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.requests = Counter()
+        self.in_progress = Counter()
+        self.durations = {}
+        self.sizes = {}
+        self.dependencies = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int):
+        """
+        Records one finished request.
+
+        :param method: The HTTP method.
+        :type method: str
+        :param route: The route template, not the requested path.
+        :type route: str
+        :param status: The status code of the response.
+        :type status: int
+        :param seconds: The time from receiving the request to sending the last byte of the response.
+        :type seconds: float
+        :param size: The size of the response body, in bytes.
+        :type size: int
+        """
+        key = (method, route, str(status))
+        self.requests[key] += 1
+        histogram = self.durations.get(key)
+        if histogram is None:
+            histogram = self.durations.setdefault(key, Histogram(self.latency_buckets))
+        histogram.observe(seconds)
+        histogram = self.sizes.get(key[:2])
+        if histogram is None:
+            histogram = self.sizes.setdefault(key[:2], Histogram(self.size_buckets))
+        histogram.observe(size)
+
+    def observe_dependency(self, name: str, seconds: float):
+        histogram = self.dependencies.get(name)
+        if histogram is None:
+            histogram = self.dependencies.setdefault(name, Histogram(self.latency_buckets))
+        histogram.observe(seconds)
+
+    def timed(self, name: str) -> Callable:
+        """
+        Decorates a dependency so that the time spent in it is recorded under ``name``.
+
+        The wrapper keeps the signature of the dependency, so FastAPI resolves its parameters as before. Only the
+        dependency's own work is timed, its sub-dependencies are resolved before it is called. For a dependency
+        with ``yield`` the time until the yield is recorded.
+
+        :param name: The label of the dependency.
+        :type name: str
+        :return: The decorator.
+        :rtype: Callable
+        """
+        def decorator(func):
+            if inspect.isasyncgenfunction(func):
+                context = asynccontextmanager(func)
+
+                @wraps(func)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    async with context(*args, **kwargs) as value:
+                        self.observe_dependency(name, time.perf_counter() - start)
+                        yield value
+            else:
+                @wraps(func)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe_dependency(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def clear(self):
+        self.requests.clear()
+        self.durations.clear()
+        self.sizes.clear()
+        self.dependencies.clear()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that records every HTTP request in a :class:`RequestMetrics`.
+
+    It is a plain ASGI callable rather than a ``BaseHTTPMiddleware``, which would copy every response body through
+    an extra task and queue.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_progress[method] += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            self.metrics.in_progress[method] -= 1
+            self.metrics.observe_request(method, route_template(scope), status, seconds, size)
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Finds the template of the route that served a request, once the router has matched it.
+
+    :param scope: The ASGI scope of the request.
+    :type scope: Scope
+    :return: The path template, ``<mount>/{path}`` for mounted apps or ``<unmatched>``.
+    :rtype: str
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Only Mount sets app_root_path, e.g. for the static media files
+    if "app_root_path" in scope:
+        return scope["root_path"][len(scope["app_root_path"]):] + "/{path}"
+    return "<unmatched>"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def format_metric(name: str, kind: str, description: str, samples: list[tuple[dict, float]]) -> list[str]:
+    """
+    Formats a counter or a gauge in the Prometheus text format.
+
+    :param name: The name of the metric.
+    :type name: str
+    :param kind: ``counter`` or ``gauge``.
+    :type kind: str
+    :param description: The help text.
+    :type description: str
+    :param samples: The labels and value of every series.
+    :type samples: list[tuple[dict, float]]
+    :return: The lines of the metric.
+    :rtype: list[str]
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+def format_histogram(name: str, description: str, histograms: list[tuple[dict, Histogram]]) -> list[str]:
+    """
+    Formats histograms in the Prometheus text format.
+
+    :param name: The name of the metric.
+    :type name: str
+    :param description: The help text.
+    :type description: str
+    :param histograms: The labels and histogram of every series.
+    :type histograms: list[tuple[dict, Histogram]]
+    :return: The lines of the metric.
+    :rtype: list[str]
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms:
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+        lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf.config import settings
+from src.database.db import SessionLocal
+from src.repository import outbox as repository_outbox
+from src.services.email import build_email, mail_sender
+from src.services.mailer import MailSender, is_permanent
+
+logger = logging.getLogger(__name__)
+
+
+def retry_at(attempts: int, err: Exception) -> datetime | None:
+    """
+    Decides when a failed email is tried again.
+
+    :param attempts: The number of attempts made so far, including the failed one.
+    :type attempts: int
+    :param err: The error of the failed attempt.
+    :type err: Exception
+    :return: The time of the next attempt, or None if the email should be given up.
+    :rtype: datetime | None
+    """
+    if is_permanent(err) or attempts >= settings.outbox_max_attempts:
+        return None
+    return datetime.now() + timedelta(seconds=settings.outbox_retry_backoff * 2 ** (attempts - 1))
+
+
+async def process_batch(db: AsyncSession, sender: MailSender) -> int:
+    """
+    Claims a batch of due emails, sends them and records the attempts.
+
+    :param db: The database session.
+    :type db: AsyncSession
+    :param sender: The sender to deliver the emails with.
+    :type sender: MailSender
+    :return: The number of claimed emails.
+    :rtype: int
+    """
+    emails = await repository_outbox.claim_emails(settings.outbox_batch_size, settings.outbox_claim_timeout, db)
+    if not emails:
+        return 0
+    messages, errors = [], {}
+    for email in emails:
+        try:
+            messages.append(build_email(email.kind, email.recipient, email.payload))
+        except Exception as err:
+            errors[email.id] = err
+    results = iter(await sender.send_many(messages))
+    attempts = []
+    for email in emails:
+        err = errors[email.id] if email.id in errors else next(results)
+        if err is None:
+            attempts.append((email, None, None))
+        else:
+            attempts.append((email, str(err) or type(err).__name__, retry_at(email.attempts + 1, err)))
+    await repository_outbox.record_attempts(attempts, db)
+    return len(emails)
+
+
+async def run_worker(session_factory: async_sessionmaker = SessionLocal, sender: MailSender = mail_sender):
+    """
+    Sends queued emails until cancelled. Any number of workers can run side by side.
+
+    A batch that fails, e.g. because the database connection was lost, is logged and the worker carries on after
+    the poll interval. Its emails are claimed again once their lease runs out.
+
+    :param session_factory: Makes the database sessions.
+    :type session_factory: async_sessionmaker
+    :param sender: The sender to deliver the emails with.
+    :type sender: MailSender
+    """
+    try:
+        while True:
+            try:
+                async with session_factory() as db:
+                    processed = await process_batch(db, sender)
+            except Exception:
+                logger.exception("Could not process a batch of the outbox")
+                processed = 0
+            if processed < settings.outbox_batch_size:
+                await asyncio.sleep(settings.outbox_poll_interval)
+    finally:
+        await sender.close()
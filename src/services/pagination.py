@@ -0,0 +1,74 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    """
+    Builds an opaque cursor pointing right after the given row.
+
+    :param sort: The sort key the page was ordered by.
+    :type sort: str
+    :param value: The value of the sort key in the last row of the page.
+    :param last_id: The ID of the last row of the page.
+    :type last_id: int
+    :return: The URL-safe cursor.
+    :rtype: str
+    """
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, last_id], separators=(",", ":"))
+    return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Decodes a cursor made by :func:`encode_cursor` for the given sort key.
+
+    :param cursor: The cursor received from the client.
+    :type cursor: str
+    :param sort: The sort key of the requested page.
+    :type sort: str
+    :return: The value of the sort key and the ID to continue after.
+    :rtype: tuple
+    :raises HTTPException: If the cursor is malformed or was made for another sort key.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(urlsafe_b64decode(padded.encode()))
+        if cursor_sort != sort or type(last_id) is not int:
+            raise ValueError(cursor)
+        if sort == "id":
+            if type(value) is not int:
+                raise ValueError(cursor)
+        elif value is not None and not isinstance(value, str):
+            raise ValueError(cursor)
+        elif sort == "birthday" and value is not None:
+            value = date.fromisoformat(value)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return value, last_id
+
+
+def next_cursor(items: list, limit: int, sort: str, field: str) -> str | None:
+    """
+    Builds the cursor of the next page if the current page is full.
+
+    :param items: The rows of the current page.
+    :type items: list
+    :param limit: The requested page size.
+    :type limit: int
+    :param sort: The sort key the page was ordered by.
+    :type sort: str
+    :param field: The attribute of the rows that holds the sort key value.
+    :type field: str
+    :return: The cursor of the next page, or None if this is the last one.
+    :rtype: str | None
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(sort, getattr(last, field), last.id)
@@ -0,0 +1,161 @@
+import asyncio
+import cProfile
+import os
+import random
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from jose import JWTError, jwt
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+
+PROFILE_NAME_RE = re.compile(r"^[\w.-]+\.pstats$")
+
+
+class ProfileStore:
+    """
+    A directory of ``pstats`` files that keeps only the most recent ones.
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def make_name(method: str, path: str) -> str:
+        """
+        Names the profile of a request after its time, method and path.
+
+        :param method: The HTTP method.
+        :type method: str
+        :param path: The requested path.
+        :type path: str
+        :return: A file name unique to the request.
+        :rtype: str
+        """
+        slug = re.sub(r"\W+", "_", path).strip("_")[:60] or "root"
+        return f"{datetime.now():%Y%m%dT%H%M%S}-{method.lower()}-{slug}-{uuid.uuid4().hex[:8]}.pstats"
+
+    def save(self, profile: cProfile.Profile, name: str):
+        """
+        Writes a profile and deletes the oldest ones beyond ``max_profiles``. Blocking, run it in a thread.
+
+        :param profile: The finished profile.
+        :type profile: cProfile.Profile
+        :param name: The file name from :meth:`make_name`.
+        :type name: str
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{name}.tmp"
+        profile.dump_stats(tmp)
+        os.replace(tmp, self.directory / name)
+        for path in self.paths()[self.max_profiles:]:
+            path.unlink(missing_ok=True)
+
+    def paths(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted((path for path in self.directory.iterdir() if PROFILE_NAME_RE.match(path.name)),
+                      key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def list(self) -> list[dict]:
+        """
+        Lists the stored profiles, newest first.
+
+        :return: The name, size and creation time of every profile.
+        :rtype: list[dict]
+        """
+        profiles = []
+        for path in self.paths():
+            stat = path.stat()
+            profiles.append({"name": path.name, "size": stat.st_size,
+                             "created_at": datetime.fromtimestamp(stat.st_mtime)})
+        return profiles
+
+    def path(self, name: str) -> Path | None:
+        """
+        Finds a stored profile by name.
+
+        :param name: The file name of the profile.
+        :type name: str
+        :return: The path of the profile, or None if there is no such profile.
+        :rtype: Path | None
+        """
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+def is_admin_token(authorization: str) -> bool:
+    """
+    Checks that an ``Authorization`` header carries a valid access token of an admin.
+
+    The signature is enough to trust the email, the route still authenticates the user as usual.
+
+    :param authorization: The value of the header.
+    :type authorization: str
+    :return: Whether the token belongs to one of ``settings.admin_emails``.
+    :rtype: bool
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return False
+    return payload.get("scope") == "access_token" and payload.get("sub") in settings.admin_emails
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests with ``cProfile`` and stores the profiles.
+
+    A request is profiled when an admin sends it with the ``X-Profile: 1`` header, or at random with
+    ``sample_rate``. The response then carries the name of the profile in ``X-Profile-Id``.
+
+    ``cProfile`` records everything the event loop runs meanwhile, including other requests, so only one request is
+    profiled at a time and the others pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, store: ProfileStore, sample_rate: float):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._active = False
+
+    def wanted(self, scope: Scope) -> bool:
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        headers = dict(scope["headers"])
+        return headers.get(b"x-profile") == b"1" and is_admin_token(headers.get(b"authorization", b"").decode())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._active or not self.wanted(scope):
+            return await self.app(scope, receive, send)
+        name = self.store.make_name(scope["method"], scope["path"])
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = name
+            await send(message)
+
+        self._active = True
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.disable()
+        finally:
+            self._active = False
+        await asyncio.to_thread(self.store.save, profile, name)
+
+
+profile_store = ProfileStore(settings.profiling_dir, settings.profiling_max_profiles)
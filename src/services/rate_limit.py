@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import Counter
+from math import ceil
+
+import redis.asyncio as redis
+from fastapi import Depends, HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import LocalCache, redis_client
+from src.services.metrics import request_metrics
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated", "unsynced", "synced_total", "synced_at", "syncing")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.unsynced = 0
+        self.synced_total = 0
+        self.synced_at = float("-inf")
+        self.syncing = False
+
+
+class RateLimitStore:
+    """
+    Token buckets per user and route, kept in process and replicated between workers through Redis.
+
+    A request only touches the local bucket. At most once per ``sync_interval`` a bucket adds its consumption to a
+    shared Redis counter and takes away from its tokens what the other workers consumed meanwhile, so every worker
+    converges on the same bucket. When Redis is unreachable every worker keeps limiting on its own.
+    """
+
+    def __init__(self, redis_client: redis.Redis, limits: dict[str, tuple[int, float]], sync_interval: float,
+                 maxsize: int, prefix: str = "rate"):
+        self.redis = redis_client
+        self.limits = limits
+        self.sync_interval = sync_interval
+        self.prefix = prefix
+        self._buckets = LocalCache(max(seconds for _, seconds in limits.values()) * 2, maxsize)
+        self._tasks = set()
+        self.stats = Counter()
+
+    def hit(self, kind: str, route: str, user_id: int) -> float:
+        """
+        Takes a token from the bucket of a user and route.
+
+        :param kind: The kind of limit, i.e. ``read`` or ``write``.
+        :type kind: str
+        :param route: The name of the route.
+        :type route: str
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: 0 if the request is allowed, otherwise the seconds until a token is available.
+        :rtype: float
+        """
+        times, seconds = self.limits[kind]
+        rate = times / seconds
+        now = time.monotonic()
+        key = (kind, route, user_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = Bucket(times, now)
+        else:
+            bucket.tokens = min(times, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+        # Stored again on every hit, so that the buckets of active users do not expire
+        self._buckets.set(key, bucket)
+        if bucket.tokens < 1:
+            self.stats["limited"] += 1
+            retry_after = (1 - bucket.tokens) / rate
+        else:
+            self.stats["allowed"] += 1
+            bucket.tokens -= 1
+            bucket.unsynced += 1
+            retry_after = 0
+        if not bucket.syncing and now - bucket.synced_at >= self.sync_interval:
+            bucket.syncing = True
+            task = asyncio.get_running_loop().create_task(self._sync(key, bucket, seconds))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return retry_after
+
+    async def _sync(self, key: tuple, bucket: Bucket, seconds: float):
+        count, bucket.unsynced = bucket.unsynced, 0
+        redis_key = f"{self.prefix}:{':'.join(map(str, key))}"
+        try:
+            total = await self.redis.incrby(redis_key, count)
+            if total == count:
+                await self.redis.expire(redis_key, ceil(seconds * 2))
+        except RedisError:
+            # Dropped rather than pushed later, when they no longer matter to the other workers
+            self.stats["errors"] += 1
+        else:
+            self.stats["syncs"] += 1
+            # A total below the last one means the counter expired and started over
+            others = total - count if total < bucket.synced_total + count else total - bucket.synced_total - count
+            bucket.tokens = max(bucket.tokens - others, 0)
+            bucket.synced_total = total
+        finally:
+            bucket.synced_at = time.monotonic()
+            bucket.syncing = False
+
+    def clear(self):
+        """
+        Drops every bucket.
+        """
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """
+    Dependency that limits the requests a user makes to a route, with the limits of ``kind`` from the settings.
+
+    The user is resolved by the same ``get_current_user`` dependency the route uses, so it costs nothing extra.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    @request_metrics.timed("rate_limiter")
+    async def __call__(self, request: Request, current_user: User = Depends(auth_service.get_current_user)):
+        retry_after = rate_limits.hit(self.kind, request.scope["endpoint"].__name__, current_user.id)
+        if retry_after:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests",
+                                headers={"Retry-After": str(ceil(retry_after))})
+
+
+rate_limits = RateLimitStore(
+    redis_client,
+    limits={
+        "read": (settings.rate_limit_read_times, settings.rate_limit_read_seconds),
+        "write": (settings.rate_limit_write_times, settings.rate_limit_write_seconds),
+    },
+    sync_interval=settings.rate_limit_sync_interval,
+    maxsize=settings.rate_limit_cache_size,
+)
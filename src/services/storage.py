@@ -0,0 +1,174 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO
+
+import cloudinary
+import cloudinary.uploader
+
+from src.conf.config import settings
+from src.services.cache import LocalCache
+
+# Keys are content hashes whose files never change, a day only bounds how long a file deleted by hand is missed
+STORED_KEYS_TTL = 24 * 3600
+STORED_KEYS_SIZE = 10_000
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files are kept. Implementations block, so their work runs in a small dedicated thread pool
+    and never on the event loop.
+    """
+
+    def __init__(self, workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+
+    async def save(self, key: str, file: BinaryIO) -> str:
+        """
+        Stores a file, replacing the one stored under the same key.
+
+        :param key: The path of the file inside the storage, e.g. ``contact_photo/user@example.com``.
+        :type key: str
+        :param file: The file to store, read from its current position.
+        :type file: BinaryIO
+        :return: The public URL of the stored file.
+        :rtype: str
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._save, key, file)
+
+    async def exists(self, key: str) -> bool:
+        """
+        Checks whether a file is stored under a key.
+
+        :param key: The path of the file inside the storage.
+        :type key: str
+        :return: True if the file exists.
+        :rtype: bool
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._exists, key)
+
+    @abstractmethod
+    def _save(self, key: str, file: BinaryIO) -> str:
+        ...
+
+    @abstractmethod
+    def _exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """
+        Builds the public URL of a stored file.
+
+        :param key: The path of the file inside the storage.
+        :type key: str
+        :return: The public URL.
+        :rtype: str
+        """
+
+
+class CloudinaryStorage(StorageBackend):
+    """
+    Stores files in Cloudinary. The extension of a key becomes the format of the asset, not part of its ID.
+
+    Looking a file up goes through the Admin API, which is rate limited per hour, so :meth:`exists` only knows the
+    keys this process stored itself. Any other key is reported missing and stored again.
+    """
+
+    def __init__(self, workers: int):
+        super().__init__(workers)
+        self._stored = LocalCache(STORED_KEYS_TTL, STORED_KEYS_SIZE)
+        cloudinary.config(
+            cloud_name=settings.cloudinary_name,
+            api_key=settings.cloudinary_api_key,
+            api_secret=settings.cloudinary_api_secret,
+            secure=True
+        )
+
+    @staticmethod
+    def public_id(key: str) -> tuple[str, str | None]:
+        public_id, dot, fmt = key.rpartition(".")
+        return (public_id, fmt) if dot and "/" not in fmt else (key, None)
+
+    def _save(self, key: str, file: BinaryIO) -> str:
+        public_id, fmt = self.public_id(key)
+        r = cloudinary.uploader.upload(file, public_id=public_id, overwrite=True)
+        return cloudinary.CloudinaryImage(public_id).build_url(format=fmt, version=r.get('version'))
+
+    async def save(self, key: str, file: BinaryIO) -> str:
+        url = await super().save(key, file)
+        self._stored.set(key, True)
+        return url
+
+    async def exists(self, key: str) -> bool:
+        # Answered on the event loop, the known keys are not shared with the storage threads
+        return self._exists(key)
+
+    def _exists(self, key: str) -> bool:
+        return self._stored.get(key) is not None
+
+    def url(self, key: str) -> str:
+        public_id, fmt = self.public_id(key)
+        return cloudinary.CloudinaryImage(public_id).build_url(format=fmt)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Stores files in a local directory served under ``base_url``, for tests and on-premises deployments.
+    """
+
+    def __init__(self, workers: int, root: str | Path, base_url: str):
+        super().__init__(workers)
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/")
+
+    def path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _save(self, key: str, file: BinaryIO) -> str:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside under a unique name and renamed, so a concurrent reader never sees a partial file and
+        # concurrent writers of the same key never share a temporary file
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(file, out)
+            # mkstemp makes the file readable by its owner only
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return self.url(key)
+
+    def _exists(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+def get_storage() -> StorageBackend:
+    """
+    Creates the storage backend chosen in the settings.
+
+    :return: The storage backend.
+    :rtype: StorageBackend
+    """
+    if settings.storage_backend == "local":
+        return LocalStorage(settings.storage_workers, settings.media_root, settings.media_url)
+    return CloudinaryStorage(settings.storage_workers)
+
+
+storage = get_storage()
@@ -1,20 +1,35 @@
+from unittest.mock import AsyncMock, patch
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from main import app
-from src.database.models import Base
+from src.conf.config import settings
+from src.database.models import Base, User
 from src.database.db import get_db
+from src.database.instrumentation import instrument
+from src.services.cache import user_cache, contacts_cache
+from src.services.rate_limit import rate_limits
+from tests.fakes import MemoryRedis
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs every request in its own event loop, so async connections must not be pooled between them
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+instrument(async_engine.sync_engine)
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -32,17 +47,53 @@ def session():
 @pytest.fixture(scope="module")
 def client(session):
     # Dependency override
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
 
-    yield TestClient(app)
+    # Every module starts with a fresh database, so cached users of the previous one must not leak in
+    user_cache.clear()
+    contacts_cache.clear()
+    rate_limits.clear()
+    redis_mock = AsyncMock()
+    redis_mock.get.return_value = None
+    # Tests call routes in quick succession, the limiter itself is tested with its own limits
+    limits = {"read": (1000, 1), "write": (1000, 1)}
+    with patch.object(user_cache, "redis", redis_mock), patch.object(contacts_cache, "redis", MemoryRedis()), \
+            patch.object(rate_limits, "redis", MemoryRedis()), patch.dict(rate_limits.limits, limits):
+        yield TestClient(app)
 
 
 @pytest.fixture(scope="module")
 def user():
     return {"username": "username", "email": "test@test.com", "password": "12345678"}
+
+
+@pytest.fixture()
+def token(client, user, session):
+    client.post("/api/auth/signup", json=user)
+    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
+    current_user.confirmed = True
+    session.commit()
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get("email"), "password": user.get("password")}
+    )
+    data = response.json()
+    return data["access_token"]
+
+
+@pytest.fixture()
+def query_budget():
+    """
+    Checks the queries a request ran against a budget, through the debug headers of the query middleware.
+    """
+    def check(response, queries: int):
+        assert int(response.headers["X-DB-Query-Count"]) <= queries, \
+            f"{response.headers['X-DB-Query-Count']} queries, budget {queries}"
+        assert response.headers["X-DB-Repeated-Queries"] == "0"
+
+    with patch.object(settings, "debug", True):
+        yield check
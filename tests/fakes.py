@@ -0,0 +1,35 @@
+"""
+Test doubles shared by the tests and the load harness in ``benchmarks``.
+"""
+
+
+class MemoryRedis:
+    """
+    In-memory stand-in for the async Redis client, with only the commands the caches and the rate limiter use.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, key):
+        return await self.incrby(key, 1)
+
+    async def incrby(self, key, amount):
+        value = int(self.data.get(key, 0)) + amount
+        self.data[key] = str(value).encode()
+        return value
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def delete(self, key):
+        self.data.pop(key, None)
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.conf.config import settings
+from src.database.instrumentation import QueryMiddleware, QueryStats, bind_shape, instrument, track_queries
+
+
+class TestQueryStats(unittest.TestCase):
+
+    def test_record(self):
+        stats = QueryStats()
+        stats.record("SELECT 1", 0.5)
+        stats.record("SELECT 1", 0.25)
+        stats.record("SELECT 2", 0.25)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.duration, 1.0)
+        self.assertEqual(stats.repeated(2), {"SELECT 1": 2})
+        self.assertEqual(stats.repeated(3), {})
+
+    def test_bind_shape(self):
+        self.assertEqual(bind_shape((1, "a", None), False), "(int, str, NoneType)")
+        self.assertEqual(bind_shape({"id": 1}, False), "{id: int}")
+        self.assertEqual(bind_shape([(1, "a"), (2, "b")], True), "2 x (int, str)")
+        self.assertEqual(bind_shape((), False), "()")
+
+
+class TestInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        instrument(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_track_queries(self):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            with track_queries() as stats:
+                for value in range(3):
+                    connection.execute(text("SELECT :value"), {"value": value})
+            connection.execute(text("SELECT 2"))
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.statements, {"SELECT ?": 3})
+        self.assertGreater(stats.duration, 0)
+
+    def test_failed_query_not_timed(self):
+        with self.engine.connect() as connection, track_queries() as stats:
+            with self.assertRaises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+            self.assertNotIn("query_start", connection.info)
+        self.assertEqual(stats.statements, {"SELECT 1": 1})
+
+    def test_slow_query_logged(self):
+        with patch.object(settings, "slow_query_threshold", 0), \
+                self.assertLogs("src.database.instrumentation", "WARNING") as logs, self.engine.connect() as connection:
+            connection.execute(text("SELECT :value"), {"value": "secret"})
+        self.assertIn("binds (str)", logs.output[0])
+        self.assertNotIn("secret", logs.output[0])
+
+    def test_middleware(self):
+        app = FastAPI()
+        app.add_middleware(QueryMiddleware)
+
+        @app.get("/items/{count}")
+        async def get_items(count: int):
+            with self.engine.connect() as connection:
+                return [connection.execute(text("SELECT :value"), {"value": value}).scalar() for value in range(count)]
+
+        client = TestClient(app)
+        with patch.object(settings, "debug", True), patch.object(settings, "query_repeat_threshold", 3), \
+                self.assertLogs("src.database.instrumentation", "WARNING") as logs:
+            response = client.get("/items/2")
+            self.assertEqual(response.headers["X-DB-Query-Count"], "2")
+            self.assertEqual(response.headers["X-DB-Repeated-Queries"], "0")
+            response = client.get("/items/3")
+            self.assertEqual(response.headers["X-DB-Repeated-Queries"], "1")
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("3 runs in GET /items/{count}", logs.output[0])
@@ -0,0 +1,22 @@
+import unittest
+
+from src.database.trigram import trigrams, similarity
+
+
+class TestTrigram(unittest.TestCase):
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams("Cat"), {"  c", " ca", "cat", "at "})
+
+    def test_similarity(self):
+        self.assertEqual(similarity("username", "USERNAME"), 1.0)
+        self.assertGreater(similarity("username", "usrname"), 0.3)
+        self.assertLess(similarity("username", "surname"), similarity("username", "usrname"))
+
+    def test_similarity_empty(self):
+        self.assertEqual(similarity(None, "username"), 0.0)
+        self.assertEqual(similarity("", "username"), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
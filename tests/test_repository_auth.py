@@ -1,6 +1,6 @@
 import unittest
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from unittest.mock import MagicMock, AsyncMock
+from sqlalchemy.ext.asyncio import AsyncSession
 from libgravatar import Gravatar
 
 from src.database.models import User
@@ -11,11 +11,13 @@ from src.repository.auth import get_user_by_email, create_user
 class TestAuth(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
+        self.result = MagicMock()
+        self.session.execute.return_value = self.result
         self.user = User(username="user", email="test@test.com", password="password")
 
     async def test_get_user_by_email(self):
-        self.session.query(self.user).filter_by(self.user.email).first.return_value = self.user
+        self.result.scalar_one_or_none.return_value = self.user
         result = await get_user_by_email(email=self.user.email, db=self.session)
         self.assertEqual(result, self.user)
 
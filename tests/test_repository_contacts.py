@@ -4,14 +4,19 @@ import os
 from pathlib import Path
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
-from src.database.models import Contact, User
-from src.schemas import ContactModel
+from src.database.models import Base, Contact, User
+from src.schemas import ContactModel, ContactFilter
 from src.repository.contacts import (
+    apply_sort,
     get_contacts,
+    get_contacts_version,
+    query_contacts,
     get_contact_by_id,
     get_contact_by_email,
     get_contact_by_name,
@@ -20,25 +25,90 @@ from src.repository.contacts import (
     create_contact,
     update_contact,
     remove_contact,
-    get_birthday_contact
+    get_birthday_contact,
+    search_contacts
 )
 
 
 class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
+        self.result = MagicMock()
+        self.session.execute.return_value = self.result
         self.user = User(id=1, username="user", email="test@test.com", password="password")
+        patcher = patch("src.repository.contacts.contacts_cache", AsyncMock())
+        self.contacts_cache = patcher.start()
+        self.addCleanup(patcher.stop)
 
     async def test_get_contacts(self):
         contacts = [Contact(), Contact(), Contact()]
-        self.session.query(Contact).filter_by().limit().offset().all.return_value = contacts
+        self.result.scalars.return_value.all.return_value = contacts
         result = await get_contacts(10, 0, self.user, self.session)
         self.assertEqual(result, contacts)
 
+    async def test_get_contacts_after_cursor(self):
+        contacts = [Contact() for _ in range(10)]
+        self.result.scalars.return_value.all.return_value = contacts
+        result = await get_contacts(10, 0, self.user, self.session, "surname", ("Bugay", 5))
+        stmt = str(self.session.execute.call_args.args[0])
+        self.assertEqual(result, contacts)
+        self.assertIn("ORDER BY contacts.surname ASC NULLS LAST, contacts.id", stmt)
+        self.assertNotIn("OFFSET", stmt)
+
+    async def test_get_contacts_after_cursor_predicate(self):
+        self.result.scalars.return_value.all.return_value = [Contact() for _ in range(10)]
+        await get_contacts(10, 0, self.user, self.session, "surname", ("Bugay", 5))
+        where = str(self.session.execute.call_args.args[0]).split("WHERE")[1].split("ORDER BY")[0]
+        # A row-value comparison is what lets the planner start a range scan of ix_contacts_user_id_surname_id
+        self.assertIn("(contacts.surname, contacts.id) > (:param_1, :param_2)", where)
+        self.assertNotIn(" OR ", where)
+        self.assertNotIn("IS NULL", where)
+        self.assertEqual(self.session.execute.call_count, 1)
+
+    async def test_get_contacts_after_cursor_fills_with_nulls(self):
+        self.result.scalars.return_value.all.return_value = [Contact(), Contact()]
+        result = await get_contacts(5, 0, self.user, self.session, "surname", ("Bugay", 5))
+        self.assertEqual(len(result), 4)
+        stmt = str(self.session.execute.call_args.args[0])
+        self.assertIn("contacts.surname IS NULL", stmt)
+        self.assertIn("ORDER BY contacts.id", stmt)
+
+    async def test_get_contacts_after_null_cursor(self):
+        self.result.scalars.return_value.all.return_value = [Contact()]
+        await get_contacts(10, 0, self.user, self.session, "surname", (None, 5))
+        where = str(self.session.execute.call_args.args[0]).split("WHERE")[1]
+        self.assertIn("contacts.surname IS NULL AND contacts.id > :id_1", where)
+        self.assertEqual(self.session.execute.call_count, 1)
+
+    async def test_get_contacts_after_cursor_not_null_column(self):
+        self.result.scalars.return_value.all.return_value = [Contact()]
+        await get_contacts(10, 0, self.user, self.session, "name", ("Andrii", 5))
+        where = str(self.session.execute.call_args.args[0]).split("WHERE")[1]
+        self.assertIn("(contacts.first_name, contacts.id) > (:param_1, :param_2)", where)
+        self.assertNotIn("IS NULL", where)
+        self.assertEqual(self.session.execute.call_count, 1)
+
+    async def test_get_contacts_version(self):
+        updated_at = datetime(2024, 1, 1, 12, 0)
+        self.result.one.return_value = (3, updated_at)
+        result = await get_contacts_version(self.user, self.session)
+        self.assertEqual(result, (3, updated_at))
+
+    async def test_query_contacts(self):
+        contacts = [Contact()]
+        self.result.scalars.return_value.all.return_value = contacts
+        filters = ContactFilter(surname="Bugay", birthday_from=date(year=2002, month=1, day=1))
+        result = await query_contacts(filters, 10, self.user, self.session, "name")
+        stmt = str(self.session.execute.call_args.args[0])
+        self.assertEqual(result, contacts)
+        self.assertIn("contacts.surname = ", stmt)
+        self.assertIn("contacts.birthday >= ", stmt)
+        self.assertNotIn("contacts.email", stmt.split("WHERE")[1])
+
     async def test_get_contact(self):
         contact = Contact()
-        self.session.query(Contact).filter().first.return_value = contact
+        self.result.scalar_one_or_none.return_value = contact
         result_id = await get_contact_by_id(1, self.user, self.session)
         result_email = await get_contact_by_email("test@test.com", self.user, self.session)
         result_phone = await get_contact_by_phone("380671125303", self.user, self.session)
@@ -47,7 +117,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result_phone, contact)
 
     async def test_get_contact_not_found(self):
-        self.session.query(Contact).filter().first.return_value = None
+        self.result.scalar_one_or_none.return_value = None
         result_id = await get_contact_by_id(1, self.user, self.session)
         result_email = await get_contact_by_email("test@test.com", self.user, self.session)
         result_phone = await get_contact_by_phone("380671125303", self.user, self.session)
@@ -57,14 +127,14 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     async def test_get_contact_by_name_surname(self):
         contacts = [Contact(), Contact(), Contact()]
-        self.session.query(Contact).filter().all.return_value = contacts
+        self.result.scalars.return_value.all.return_value = contacts
         result_name = await get_contact_by_name("username", self.user, self.session)
         result_surname = await get_contact_by_surname("surname", self.user, self.session)
         self.assertEqual(result_name, contacts)
         self.assertEqual(result_surname, contacts)
 
     async def test_get_contact_by_name_surname_not_found(self):
-        self.session.query(Contact).filter().all.return_value = None
+        self.result.scalars.return_value.all.return_value = None
         result_name = await get_contact_by_name("username", self.user, self.session)
         result_surname = await get_contact_by_surname("surname", self.user, self.session)
         self.assertIsNone(result_name)
@@ -79,6 +149,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         result = await create_contact(body, self.user, self.session)
         self.assertEqual(result.first_name, body.first_name)
         self.assertTrue(hasattr(result, "id"))
+        self.contacts_cache.bump.assert_awaited_once_with(self.user.id)
 
     async def test_update_contact(self):
         body = ContactModel(first_name="Andrii",
@@ -87,7 +158,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
                             phone_number="380934267600",
                             birthday=date(year=2002, month=11, day=22))
         contact = Contact()
-        self.session.query(Contact).filter().first.return_value = contact
+        self.result.scalar_one_or_none.return_value = contact
         self.session.commit.return_value = None
         result = await update_contact(body, self.session, self.user, 1)
         self.assertEqual(result, contact)
@@ -99,28 +170,29 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
                             phone_number="380934267600",
                             birthday=date(year=2002, month=11, day=22))
         contact = Contact()
-        self.session.query(Contact).filter().first.return_value = None
+        self.result.scalar_one_or_none.return_value = None
         self.session.commit.return_value = None
         result = await update_contact(body, self.session, self.user, 1)
         self.assertIsNone(result)
 
     async def test_remove_contact(self):
         contact = Contact()
-        self.session.query(Contact).filter().first.return_value = contact
+        self.result.scalar_one_or_none.return_value = contact
         result = await remove_contact(1, self.user, self.session)
         self.assertEqual(result, contact)
 
     async def test_remove_contact_not_found(self):
-        self.session.query(Contact).filter().first.return_value = None
+        self.result.scalar_one_or_none.return_value = None
         result = await remove_contact(1, self.user, self.session)
         self.assertIsNone(result)
+        self.contacts_cache.bump.assert_not_awaited()
 
     async def test_get_birthday_contact(self):
         now = datetime.now()
         contacts = [Contact(birthday=date(year=now.year, month=now.month, day=now.day)),
                     Contact(birthday=date(year=now.year, month=now.month, day=now.day)),
                     Contact(birthday=date(year=now.year, month=now.month, day=now.day))]
-        self.session.query(Contact).filter_by().all.return_value = contacts
+        self.result.scalars.return_value.all.return_value = contacts
         result = await get_birthday_contact(self.user, self.session)
         self.assertEqual(result, contacts)
 
@@ -129,10 +201,115 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         contacts = [Contact(birthday=date(year=now.year, month=now.month, day=now.day)),
                     Contact(birthday=date(year=now.year, month=now.month, day=now.day)),
                     Contact(birthday=date(year=now.year, month=now.month, day=now.day))]
-        self.session.query(Contact).filter_by().all.return_value = None
+        self.result.scalars.return_value.all.return_value = None
         result = await get_birthday_contact(self.user, self.session)
         self.assertIsNone(result)
 
+    async def test_get_birthday_contact_year_wrap(self):
+        self.result.scalars.return_value.all.return_value = []
+        with patch("src.repository.contacts.date") as date_mock:
+            date_mock.today.return_value = date(year=2023, month=12, day=30)
+            await get_birthday_contact(self.user, self.session, 7)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertIn(" OR ", str(stmt))
+        self.assertEqual(set(stmt.compile().params.values()), {1, 1230, 106})
+
+    async def test_get_birthday_contact_leap_day(self):
+        self.result.scalars.return_value.all.return_value = []
+        with patch("src.repository.contacts.date") as date_mock:
+            date_mock.today.return_value = date(year=2023, month=2, day=21)
+            await get_birthday_contact(self.user, self.session, 7)
+        stmt = self.session.execute.call_args.args[0]
+        self.assertIn(229, stmt.compile().params.values())
+
+    async def test_search_contacts_postgresql_threshold(self):
+        self.session.bind = MagicMock()
+        self.session.bind.dialect.name = "postgresql"
+        self.result.scalars.return_value.all.return_value = []
+        with patch("src.repository.contacts.settings.search_similarity_threshold", 0.45):
+            await search_contacts("Bugay", self.user, self.session)
+        set_threshold, search = (call.args[0] for call in self.session.execute.await_args_list)
+        compiled = set_threshold.compile(dialect=postgresql.dialect())
+        self.assertIn("set_config", str(compiled))
+        self.assertEqual(list(compiled.params.values()), ["pg_trgm.similarity_threshold", "0.45", True])
+        self.assertIn("(contacts.surname %% %(surname_2)s)", str(search.compile(dialect=postgresql.dialect())))
+
+    async def test_search_contacts_sqlite_threshold(self):
+        self.session.bind = MagicMock()
+        self.session.bind.dialect.name = "sqlite"
+        self.result.scalars.return_value.all.return_value = []
+        with patch("src.repository.contacts.settings.search_similarity_threshold", 0.45):
+            await search_contacts("Bugay", self.user, self.session)
+        stmt = self.session.execute.await_args.args[0]
+        self.assertEqual(self.session.execute.await_count, 1)
+        self.assertIn(0.45, stmt.compile().params.values())
+
+
+
+class TestContactsKeyset(unittest.IsolatedAsyncioTestCase):
+    """
+    Keyset pages read from a real database, deep into the contacts of a user.
+    """
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self.session = async_sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.user = User(id=1, username="user", email="test@test.com", password="password")
+        surnames = ["Bondar", "Melnyk", "Shevchenko", None]
+        self.session.add(self.user)
+        self.session.add_all([
+            Contact(first_name=f"Name{number % 7}", surname=surnames[number % 4], email=f"user{number}@test.com",
+                    phone_number=f"380{number:09d}", birthday=date(1990 + number % 3, 1, 1), user_id=1)
+            for number in range(300)
+        ])
+        await self.session.commit()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    @staticmethod
+    def sort_key(contact: Contact):
+        return contact.surname is None, contact.surname or "", contact.id
+
+    async def page_through(self, read_page, limit: int) -> list[Contact]:
+        contacts, after = [], None
+        while True:
+            page = await read_page(after)
+            contacts.extend(page)
+            if len(page) < limit:
+                return contacts
+            after = (page[-1].surname, page[-1].id)
+
+    async def test_get_contacts_pages(self):
+        result = await self.page_through(
+            lambda after: get_contacts(7, 0, self.user, self.session, "surname", after), 7)
+        everything = await get_contacts(1000, 0, self.user, self.session, "surname")
+        self.assertEqual(len(result), 300)
+        self.assertEqual([contact.id for contact in result],
+                         [contact.id for contact in sorted(everything, key=self.sort_key)])
+
+    async def test_query_contacts_deep_cursor(self):
+        filters = ContactFilter(birthday_from=date(1991, 1, 1))
+        matching = sorted([contact for contact in await get_contacts(1000, 0, self.user, self.session)
+                           if contact.birthday >= date(1991, 1, 1)], key=self.sort_key)
+        deep = matching[150]
+        result = await query_contacts(filters, 10, self.user, self.session, "surname", (deep.surname, deep.id))
+        self.assertEqual([contact.id for contact in result], [contact.id for contact in matching[151:161]])
+        result = await self.page_through(
+            lambda after: query_contacts(filters, 9, self.user, self.session, "surname", after), 9)
+        self.assertEqual([contact.id for contact in result], [contact.id for contact in matching])
+
+    async def test_cursor_uses_index_range(self):
+        stmt = apply_sort(select(Contact).filter(Contact.user_id == 1), "surname", ("Melnyk", 150)).limit(10)
+        sql = str(stmt.compile(self.engine.sync_engine, compile_kwargs={"literal_binds": True}))
+        async with self.engine.connect() as connection:
+            plan = " ".join(row[3] for row in await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+        self.assertIn("ix_contacts_user_id_surname_id (user_id=? AND surname>?)", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
 
 if __name__ == '__main__':
     unittest.main()
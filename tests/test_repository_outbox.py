@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, AsyncMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox
+from src.repository.outbox import add_email, claim_emails, record_attempts
+
+
+class TestOutbox(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = AsyncMock(spec=AsyncSession)
+        self.session.add = MagicMock()
+        self.result = MagicMock()
+        self.session.execute.return_value = self.result
+
+    async def test_add_email(self):
+        result = await add_email("confirm_email", "test@test.com", {"username": "user"}, self.session)
+        self.assertEqual(result.recipient, "test@test.com")
+        self.session.add.assert_called_once_with(result)
+        self.session.commit.assert_awaited_once()
+
+    async def test_add_email_without_commit(self):
+        await add_email("confirm_email", "test@test.com", {"username": "user"}, self.session, commit=False)
+        self.session.commit.assert_not_awaited()
+
+    async def test_claim_emails(self):
+        emails = [EmailOutbox(), EmailOutbox()]
+        self.result.scalars.return_value.all.return_value = emails
+        result = await claim_emails(10, 60, self.session)
+        self.assertEqual(result, emails)
+        stmt = self.session.execute.await_args.args[0]
+        self.assertEqual(stmt._for_update_arg.skip_locked, True)
+        self.assertTrue(all(email.retry_at > datetime.now() for email in emails))
+        self.session.commit.assert_awaited_once()
+
+    async def test_record_attempts(self):
+        sent, retried, failed = (EmailOutbox(status="pending", attempts=0) for _ in range(3))
+        retry_at = datetime(2024, 1, 1, 12, 0)
+        await record_attempts([(sent, None, None), (retried, "timeout", retry_at), (failed, "refused", None)],
+                              self.session)
+        self.assertEqual((sent.status, sent.attempts), ("sent", 1))
+        self.assertIsNotNone(sent.sent_at)
+        self.assertEqual((retried.status, retried.retry_at), ("pending", retry_at))
+        self.assertEqual((failed.status, failed.last_error), ("failed", "refused"))
+        self.session.commit.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.schemas import RequestPassword
 from src.database.models import User
@@ -11,20 +11,26 @@ from src.repository.users import update_password, update_avatar, get_user_by_ema
 class TestUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = AsyncMock(spec=AsyncSession)
+        self.result = MagicMock()
+        self.session.execute.return_value = self.result
         self.user = User(id=1, username="user", email="test@test.com", password="password")
+        patcher = patch("src.repository.users.user_cache", AsyncMock())
+        self.user_cache = patcher.start()
+        self.addCleanup(patcher.stop)
 
     async def test_get_user_by_email_for_confirm(self):
-        self.session.query(User).filter().first.return_value = self.user
+        self.result.scalar_one_or_none.return_value = self.user
         result = await get_user_by_email_for_confirm("test@test.com", self.session)
         self.assertEqual(result, self.user)
 
     async def test_update_avatar_and_password(self):
-        self.session.query(User).filter().first.return_value = self.user
+        self.result.scalar_one_or_none.return_value = self.user
         result_avatar = await update_avatar("test@test.com", "url.com", self.session)
         result_password = await update_password("test@test.com", RequestPassword(password="password"), self.session)
         self.assertEqual(result_avatar, self.user)
         self.assertEqual(result_password, self.user)
+        self.user_cache.invalidate.assert_awaited_with("test@test.com")
 
 
 if __name__ == '__main__':
@@ -1,10 +1,7 @@
-from unittest.mock import MagicMock
-from src.database.models import User
+from src.database.models import User, EmailOutbox
 
 
-def test_create_user(client, user, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+def test_create_user(client, session, user):
     response = client.post(
         "/api/auth/signup",
         json=user
@@ -13,6 +10,10 @@ def test_create_user(client, user, monkeypatch):
     data = response.json()
     assert data["email"] == user.get("email")
     assert "id" in data
+    email: EmailOutbox = session.query(EmailOutbox).filter(EmailOutbox.recipient == user.get("email")).one()
+    assert email.kind == "confirm_email"
+    assert email.status == "pending"
+    assert email.payload["username"] == user.get("username")
 
 
 def test_repeat_create_user(client, user):
@@ -66,3 +67,23 @@ def test_login_wrong_email(client, user):
     assert response.status_code == 401, response.text
     data = response.json()
     assert data["detail"] == "Invalid email"
+
+
+def test_request_email(client, session, user):
+    response = client.post(
+        "/api/auth/request_email",
+        json={"email": user.get("email")}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["message"] == "Your email is already confirmed"
+    assert session.query(EmailOutbox).filter(EmailOutbox.kind == "confirm_email").count() == 1
+
+
+def test_reset_password(client, session, user):
+    response = client.post(
+        "/api/auth/reset_password",
+        json={"email": user.get("email")}
+    )
+    assert response.status_code == 200, response.text
+    email: EmailOutbox = session.query(EmailOutbox).filter(EmailOutbox.kind == "reset_password").one()
+    assert email.recipient == user.get("email")
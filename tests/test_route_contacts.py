@@ -1,33 +1,16 @@
+import json
 from datetime import datetime
 
-from unittest.mock import MagicMock, patch, AsyncMock
-import pytest
+from unittest.mock import patch
 
-from src.database.models import User
+from src.conf.config import settings
 from src.services.auth import auth_service
+from src.services.pagination import encode_cursor
+from src.services.rate_limit import rate_limits
 
 
-@pytest.fixture()
-def token(client, user, session, monkeypatch):
-    mock_send_email = MagicMock()
-    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
-    client.post("/api/auth/signup", json=user)
-    current_user: User = session.query(User).filter(User.email == user.get("email")).first()
-    current_user.confirmed = True
-    session.commit()
-    response = client.post(
-        "/api/auth/login",
-        data={"username": user.get("email"), "password": user.get("password")}
-    )
-    data = response.json()
-    return data["access_token"]
-
-
-def test_create_contact(client, token, monkeypatch):
+def test_create_contact(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())  # Треба щоб замокати fastapilimiter
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         birthday = datetime.now().isoformat().split("T")[0]
         response = client.post(
@@ -46,11 +29,8 @@ def test_create_contact(client, token, monkeypatch):
         assert "id" in data
 
 
-def test_get_contact_by_id(client, token, monkeypatch):
+def test_get_contact_by_id(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts/1",
@@ -62,11 +42,8 @@ def test_get_contact_by_id(client, token, monkeypatch):
         assert "id" in data
 
 
-def test_get_contact_by_email(client, token, monkeypatch):
+def test_get_contact_by_email(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts/?contact_email=test%40example.com",
@@ -77,11 +54,8 @@ def test_get_contact_by_email(client, token, monkeypatch):
         assert data[0]["first_name"] == "username"
 
 
-def test_get_contact_by_name(client, token, monkeypatch):
+def test_get_contact_by_name(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts/search_by_name?contact_name=username",
@@ -92,11 +66,8 @@ def test_get_contact_by_name(client, token, monkeypatch):
         assert data[0]["email"] == "test@example.com"
 
 
-def test_get_contact_by_surname(client, token, monkeypatch):
+def test_get_contact_by_surname(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts/search_by_surname?contact_surname=surname",
@@ -107,11 +78,8 @@ def test_get_contact_by_surname(client, token, monkeypatch):
         assert data[0]["email"] == "test@example.com"
 
 
-def test_get_contact_birthday(client, token, monkeypatch):
+def test_get_contact_birthday(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts/birthday",
@@ -122,11 +90,8 @@ def test_get_contact_birthday(client, token, monkeypatch):
         assert data[0]["email"] == "test@example.com"
 
 
-def test_get_contacts(client, token, monkeypatch):
+def test_get_contacts(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.get(
             "/api/contacts",
@@ -138,11 +103,143 @@ def test_get_contacts(client, token, monkeypatch):
         assert "id" in data[0]
 
 
-def test_update_contact(client, token, monkeypatch):
+def test_get_contacts_rate_limited(client, token):
+    with patch.object(auth_service, "r") as r_mock, patch.dict(rate_limits.limits, {"read": (1, 60)}):
+        r_mock.get.return_value = None
+        rate_limits.clear()
+        response = client.get(
+            "/api/contacts",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        response = client.get(
+            "/api/contacts",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 429, response.text
+        assert response.headers["Retry-After"] == "60"
+    rate_limits.clear()
+
+
+def test_get_contacts_not_modified(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        etag = response.headers["ETag"]
+        response = client.get(
+            "/api/contacts",
+            headers={"Authorization": f"Bearer {token}", "If-None-Match": etag}
+        )
+        assert response.status_code == 304, response.text
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+        response = client.get(
+            "/api/contacts?limit=5",
+            headers={"Authorization": f"Bearer {token}", "If-None-Match": etag}
+        )
+        assert response.status_code == 200, response.text
+        assert response.headers["ETag"] != etag
+
+
+def test_search_contacts(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        for query in ("User", "ernam", "usrname", "38067"):
+            response = client.get(
+                f"/api/contacts/search?q={query}",
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert data[0]["email"] == "test@example.com", query
+
+
+def test_search_contacts_not_found(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts/search?q=%25",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == []
+
+
+def test_query_contacts(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        today = datetime.now().date().isoformat()
+        response = client.get(
+            f"/api/contacts/query?first_name=username&surname=surname&birthday_from={today}&birthday_to={today}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["items"][0]["email"] == "test@example.com"
+        assert data["next_cursor"] is None
+        assert data["query_time_ms"] >= 0
+
+
+def test_query_contacts_not_found(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts/query?first_name=username&email=user%40example.com",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["items"] == []
+
+
+def test_get_contacts_cursor(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts?limit=1&sort=birthday",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()[0]["first_name"] == "username"
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(
+            f"/api/contacts?limit=1&sort=birthday&after={cursor}",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json() == []
+        assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_contacts_invalid_cursor(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts?sort=name&after=not-a-cursor",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_get_contacts_cursor_wrong_value_type(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        for sort, value in (("name", 5), ("surname", ["Bugay"]), ("name", {"a": 1}), ("birthday", 20020112),
+                            ("id", "1")):
+            response = client.get(
+                f"/api/contacts?sort={sort}&after={encode_cursor(sort, value, 1)}",
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == 400, response.text
+            assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_update_contact(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.put(
             "/api/contacts/1",
@@ -160,11 +257,8 @@ def test_update_contact(client, token, monkeypatch):
         assert data["email"] == "user@example.com"
 
 
-def test_remove_contact(client, token, monkeypatch):
+def test_remove_contact(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.delete(
             "/api/contacts/1",
@@ -175,11 +269,8 @@ def test_remove_contact(client, token, monkeypatch):
         assert data["email"] == "user@example.com"
 
 
-def test_repeat_remove_contact(client, token, monkeypatch):
+def test_repeat_remove_contact(client, token):
     with patch.object(auth_service, "r") as r_mock:
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.redis", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.identifier", AsyncMock())
-        monkeypatch.setattr("fastapi_limiter.FastAPILimiter.http_callback", AsyncMock())
         r_mock.get.return_value = None
         response = client.delete(
             "/api/contacts/1",
@@ -188,3 +279,106 @@ def test_repeat_remove_contact(client, token, monkeypatch):
         assert response.status_code == 404, response.text
         data = response.json()
         assert data["detail"] == "Not found!"
+
+
+def test_import_contacts_csv(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        content = ("first_name,surname,email,phone_number,birthday\n"
+                   "first,surname,first@example.com,380670000001,2002-01-12\n"
+                   "second,surname,not-an-email,380670000002,2002-01-12\n"
+                   "third,surname,third@example.com,380670000001,2002-01-12\n"
+                   "fourth,surname,fourth@example.com,380670000004,2002-02-29\n")
+        response = client.post(
+            "/api/contacts/import",
+            files={"file": ("contacts.csv", content, "text/csv")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["created"] == 1
+        assert data["duplicates"] == 1
+        assert data["failed"] == 2
+        assert [error["row"] for error in data["errors"]] == [2, 3, 4]
+
+
+def test_import_contacts_invalid_csv(client, token):
+    with patch.object(auth_service, "r") as r_mock, patch.object(settings, "import_max_errors", 2):
+        r_mock.get.return_value = None
+        oversized = "x" * 200_000
+        content = ("first_name,surname,email,phone_number,birthday\n"
+                   "first,surname,first@example.com,380670000001,2002-01-12\n"
+                   f"{oversized},surname,seventh@example.com,380670000007,2002-01-12\n"
+                   f"{oversized},surname,eighth@example.com,380670000008,2002-01-12\n"
+                   "ninth,surname,ninth@example.com,380670000009,2002-01-12\n")
+        response = client.post(
+            "/api/contacts/import",
+            files={"file": ("contacts.csv", content, "text/csv")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["created"] == 0
+        assert data["duplicates"] == 1
+        assert data["failed"] == 2
+        assert [error["row"] for error in data["errors"]] == [2, 3]
+        assert "field larger than field limit" in data["errors"][0]["detail"]
+        assert "rest is skipped" in data["errors"][1]["detail"]
+
+
+def test_import_contacts_ndjson(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        content = ('{"first_name": "first", "surname": "surname", "email": "first@example.com", '
+                   '"phone_number": "380670000001", "birthday": "2002-01-12"}\n'
+                   '{"first_name": "fifth", "surname": "surname", "email": "fifth@example.com", '
+                   '"phone_number": "380670000005", "birthday": "2002-01-12"}\n'
+                   'not json\n')
+        response = client.post(
+            "/api/contacts/import?file_format=ndjson",
+            files={"file": ("contacts.txt", content, "text/plain")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["created"] == 1
+        assert data["duplicates"] == 1
+        assert data["failed"] == 1
+
+
+def test_import_contacts_unknown_format(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.post(
+            "/api/contacts/import",
+            files={"file": ("contacts.txt", "", "text/plain")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 415, response.text
+
+
+def test_export_contacts_ndjson(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts/export",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["phone_number"] for row in rows] == ["380670000001", "380670000005"]
+        assert rows[0]["birthday"] == "2002-01-12"
+
+
+def test_export_contacts_csv(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/contacts/export?file_format=csv",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        lines = response.text.splitlines()
+        assert lines[0] == "id,first_name,surname,email,phone_number,birthday"
+        assert len(lines) == 3
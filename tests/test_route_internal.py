@@ -0,0 +1,117 @@
+from unittest.mock import patch
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+from src.services.profiling import profile_store
+
+
+def test_get_db_pool_status(client, user, token):
+    with patch.object(auth_service, "r") as r_mock, patch.object(settings, "admin_emails", [user["email"]]):
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/internal/db_pool",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data["checked_out"] >= 0
+        assert data["overflow"] >= 0
+        assert "+Inf" in data["checkout_wait"]["buckets"]
+
+
+def test_get_db_pool_status_unauthorized(client):
+    response = client.get("/api/internal/db_pool")
+    assert response.status_code == 401, response.text
+
+
+def test_get_db_pool_status_admins_only(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get("/api/internal/db_pool", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403, response.text
+
+
+def test_get_cache_stats(client, user, token):
+    with patch.object(auth_service, "r") as r_mock, patch.object(settings, "admin_emails", [user["email"]]):
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/internal/cache",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert "user" in data
+        assert "contacts" in data
+
+
+def test_get_cache_stats_admins_only(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get("/api/internal/cache", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403, response.text
+
+
+def test_profile_request(client, user, token, tmp_path):
+    with patch.object(auth_service, "r") as r_mock, patch.object(settings, "admin_emails", [user["email"]]), \
+            patch.object(profile_store, "directory", tmp_path):
+        r_mock.get.return_value = None
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.get("/api/contacts/", headers={**headers, "X-Profile": "1"})
+        assert response.status_code == 200, response.text
+        name = response.headers["X-Profile-Id"]
+
+        response = client.get("/api/internal/profiles", headers=headers)
+        assert response.status_code == 200, response.text
+        assert [profile["name"] for profile in response.json()] == [name]
+
+        response = client.get(f"/api/internal/profiles/{name}", headers=headers)
+        assert response.status_code == 200, response.text
+        assert len(response.content) > 0
+
+        response = client.get("/api/internal/profiles/missing.pstats", headers=headers)
+        assert response.status_code == 404, response.text
+
+
+def test_profiles_admins_only(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get("/api/internal/profiles", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403, response.text
+
+
+def test_memory_tracing(client, user, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    with patch.object(auth_service, "r") as r_mock, patch.object(settings, "admin_emails", [user["email"]]):
+        r_mock.get.return_value = None
+        response = client.get("/api/internal/memory/top", headers=headers)
+        assert response.status_code == 409, response.text
+
+        response = client.post("/api/internal/memory/start", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["tracing"] is True
+        try:
+            response = client.post("/api/internal/memory/baseline", headers=headers)
+            assert response.status_code == 200, response.text
+            assert response.json()["baseline"] is True
+
+            response = client.get("/api/contacts/birthday", headers=headers)
+            assert response.status_code == 200, response.text
+
+            response = client.get("/api/internal/memory/top?limit=5", headers=headers)
+            assert response.status_code == 200, response.text
+            assert len(response.json()) <= 5
+
+            response = client.get("/api/internal/memory/routes", headers=headers)
+            assert response.status_code == 200, response.text
+            assert "/api/contacts/birthday" in [stat["route"] for stat in response.json()]
+        finally:
+            response = client.post("/api/internal/memory/stop", headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["tracing"] is False
+
+
+def test_memory_admins_only(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get("/api/internal/memory", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403, response.text
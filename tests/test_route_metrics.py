@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+
+
+def test_get_metrics(client, token):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.delete("/api/contacts/7", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404, response.text
+    with patch.object(settings, "metrics_token", "scrape-token"):
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_requests_total{method="DELETE",route="/api/contacts/{contact_id}",status="404"}' in text
+    assert 'http_request_duration_seconds_bucket{method="DELETE",route="/api/contacts/{contact_id}",status="404",' \
+           'le="+Inf"}' in text
+    assert 'http_response_size_bytes_count{method="DELETE",route="/api/contacts/{contact_id}"}' in text
+    assert 'dependency_duration_seconds_count{dependency="get_current_user"}' in text
+    assert 'dependency_duration_seconds_count{dependency="rate_limiter"}' in text
+    assert "db_pool_checkout_wait_seconds_count" in text
+
+
+def test_get_metrics_unauthorized(client, token):
+    with patch.object(settings, "metrics_token", "scrape-token"):
+        response = client.get("/metrics")
+        assert response.status_code == 401, response.text
+        response = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == 401, response.text
+        # A user's access token is not a scrape token
+        response = client.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401, response.text
+
+
+def test_get_metrics_without_token_configured(client):
+    with patch.object(settings, "metrics_token", None):
+        response = client.get("/metrics", headers={"Authorization": "Bearer "})
+        assert response.status_code == 401, response.text
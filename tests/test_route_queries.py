@@ -0,0 +1,74 @@
+"""
+Query budgets of the routes: a new query on a hot path has to be a deliberate change of its budget here.
+
+Budgets include the lookup of the current user, which the user cache usually saves.
+"""
+from itertools import count
+
+import pytest
+
+numbers = count(1)
+
+
+def new_contact(**fields) -> dict:
+    number = next(numbers)
+    return {
+        "first_name": "Budget",
+        "surname": "Queries",
+        "email": f"budget{number}@example.com",
+        "phone_number": f"+3805000{number:05d}",
+        "birthday": "1990-01-01",
+        **fields,
+    }
+
+
+@pytest.fixture()
+def contact_id(client, token):
+    response = client.post("/api/contacts/", json=new_contact(), headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+@pytest.mark.parametrize("url, queries", [
+    ("/api/contacts/", 2),
+    ("/api/contacts/{contact_id}", 2),
+    ("/api/contacts/search?q=Budget", 2),
+    ("/api/contacts/birthday", 2),
+    ("/api/contacts/query?first_name=Budget", 2),
+    ("/api/users/me/", 1),
+])
+def test_read_budgets(client, token, contact_id, query_budget, url, queries):
+    response = client.get(url.format(contact_id=contact_id), headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    query_budget(response, queries)
+
+
+def test_create_budget(client, token, query_budget):
+    response = client.post("/api/contacts/", json=new_contact(), headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 201, response.text
+    query_budget(response, 4)
+
+
+def test_update_budget(client, token, contact_id, query_budget):
+    response = client.put(f"/api/contacts/{contact_id}", json=new_contact(first_name="Updated"),
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    query_budget(response, 3)
+
+
+def test_delete_budget(client, token, contact_id, query_budget):
+    response = client.delete(f"/api/contacts/{contact_id}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    query_budget(response, 3)
+
+
+def test_login_budget(client, user, token, query_budget):
+    response = client.post("/api/auth/login", data={"username": user["email"], "password": user["password"]})
+    assert response.status_code == 200, response.text
+    query_budget(response, 2)
+
+
+def test_headers_only_in_debug(client, token):
+    response = client.get("/api/contacts/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert "X-DB-Query-Count" not in response.headers
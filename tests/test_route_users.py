@@ -0,0 +1,54 @@
+import io
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.services.auth import auth_service
+from src.services.storage import LocalStorage
+
+
+def test_read_users_me(client, token, user):
+    with patch.object(auth_service, "r") as r_mock:
+        r_mock.get.return_value = None
+        response = client.get(
+            "/api/users/me/",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["email"] == user.get("email")
+
+
+def make_image(color: str) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_update_avatar_user(client, token, tmp_path):
+    storage = LocalStorage(workers=1, root=tmp_path, base_url="/media")
+    with patch.object(auth_service, "r") as r_mock, patch("src.services.images.storage", storage):
+        r_mock.get.return_value = None
+        response = client.patch(
+            "/api/users/avatar",
+            files={"file": ("avatar.png", make_image("red"), "image/png")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200, response.text
+        avatar = response.json()["avatar"]
+        assert avatar.startswith("/media/avatars/") and avatar.endswith("/250.webp")
+        key = avatar.removeprefix("/media/")
+        with Image.open(tmp_path / key) as image:
+            assert image.size == (250, 250)
+        assert (tmp_path / key).with_name("64.webp").is_file()
+
+
+def test_update_avatar_user_invalid_image(client, token, tmp_path):
+    storage = LocalStorage(workers=1, root=tmp_path, base_url="/media")
+    with patch.object(auth_service, "r") as r_mock, patch("src.services.images.storage", storage):
+        r_mock.get.return_value = None
+        response = client.patch(
+            "/api/users/avatar",
+            files={"file": ("avatar.png", b"not an image", "image/png")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 415, response.text
@@ -0,0 +1,37 @@
+import unittest
+
+from passlib.hash import bcrypt
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+
+
+class TestPasswordHashing(unittest.IsolatedAsyncioTestCase):
+
+    async def test_get_password_hash(self):
+        hashed = await auth_service.get_password_hash("password")
+        self.assertEqual(bcrypt.from_string(hashed).rounds, settings.bcrypt_rounds)
+        self.assertTrue(await auth_service.verify_password("password", hashed))
+        self.assertFalse(await auth_service.verify_password("fake_pass", hashed))
+
+    async def test_verify_and_update_password_upgrades_cost(self):
+        hashed = bcrypt.using(rounds=settings.bcrypt_rounds - 1).hash("password")
+        valid, new_hash = await auth_service.verify_and_update_password("password", hashed)
+        self.assertTrue(valid)
+        self.assertEqual(bcrypt.from_string(new_hash).rounds, settings.bcrypt_rounds)
+
+    async def test_verify_and_update_password_current_cost(self):
+        hashed = await auth_service.get_password_hash("password")
+        valid, new_hash = await auth_service.verify_and_update_password("password", hashed)
+        self.assertTrue(valid)
+        self.assertIsNone(new_hash)
+
+    async def test_verify_and_update_password_wrong(self):
+        hashed = await auth_service.get_password_hash("password")
+        valid, new_hash = await auth_service.verify_and_update_password("fake_pass", hashed)
+        self.assertFalse(valid)
+        self.assertIsNone(new_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+from datetime import datetime
+from typing import List
+from unittest.mock import AsyncMock
+
+from pydantic import TypeAdapter
+from redis.exceptions import ConnectionError
+
+from src.database.models import User, Contact
+from src.schemas import ContactResponse
+from src.services.cache import UserCache, ResponseCache
+from src.services.etag import make_etag, etag_matches
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.redis.get.return_value = None
+        self.cache = UserCache(self.redis, ttl=300, local_ttl=5, maxsize=2)
+        self.user = User(id=1, username="user", email="test@test.com", password="password", avatar="url.com",
+                         confirmed=True, created_at=datetime(2024, 1, 1, 12, 0))
+
+    async def test_get_miss(self):
+        result = await self.cache.get("test@test.com")
+        self.assertIsNone(result)
+
+    async def test_set_and_get_local(self):
+        await self.cache.set(self.user)
+        result = await self.cache.get("test@test.com")
+        self.redis.get.assert_not_called()
+        self.assertEqual(result.id, self.user.id)
+        self.assertEqual(result.created_at, self.user.created_at)
+        self.assertIsNone(result.password)
+
+    async def test_get_from_redis(self):
+        self.redis.get.return_value = self.cache.dumps(self.user)
+        result = await self.cache.get("test@test.com")
+        await self.cache.get("test@test.com")
+        self.assertEqual(result.email, self.user.email)
+        self.redis.get.assert_awaited_once_with("user:test@test.com")
+
+    async def test_invalidate(self):
+        await self.cache.set(self.user)
+        await self.cache.invalidate("test@test.com")
+        result = await self.cache.get("test@test.com")
+        self.assertIsNone(result)
+        self.redis.delete.assert_awaited_once_with("user:test@test.com")
+
+    async def test_lru_eviction(self):
+        for user_id in range(3):
+            await self.cache.set(User(id=user_id, username="user", email=f"{user_id}@test.com"))
+        self.assertEqual(list(self.cache._local), ["1@test.com", "2@test.com"])
+
+    async def test_redis_unavailable(self):
+        self.redis.get.side_effect = ConnectionError()
+        self.redis.set.side_effect = ConnectionError()
+        await self.cache.set(self.user)
+        self.cache.clear()
+        result = await self.cache.get("test@test.com")
+        self.assertIsNone(result)
+
+
+class TestResponseCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.store = {}
+        self.redis = AsyncMock()
+        self.redis.get.side_effect = self.store.get
+        self.redis.set.side_effect = self.set
+        self.redis.incr.side_effect = self.incr
+        self.cache = ResponseCache(self.redis, prefix="contacts", ttl=300, local_ttl=5, maxsize=10)
+        self.adapter = TypeAdapter(List[ContactResponse])
+        self.contacts = [Contact(id=1, first_name="Andrii", surname="Bugay", email="test@test.com",
+                                 phone_number="380934267600", birthday=datetime(2002, 11, 22).date())]
+        self.load = AsyncMock(return_value=self.contacts)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+    async def test_cached_loads_once(self):
+        first = await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        second = await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        self.load.assert_awaited_once()
+        self.assertEqual(first.body, second.body)
+        self.assertEqual(self.cache.stats["local_hits"], 1)
+
+    async def test_cached_from_redis(self):
+        await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter,
+                                lambda contacts: {"X-Next-Cursor": "cursor"})
+        self.cache.clear()
+        response = await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        self.load.assert_awaited_once()
+        self.assertEqual(response.headers["X-Next-Cursor"], "cursor")
+        self.assertEqual(self.cache.stats["redis_hits"], 1)
+
+    async def test_bump_invalidates(self):
+        await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        await self.cache.bump(1)
+        await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        await self.cache.cached(2, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        self.assertEqual(self.load.await_count, 3)
+
+    async def test_version_not_repeated_after_loss(self):
+        await self.cache.bump(1)
+        lost = await self.cache.version(1)
+        self.store.clear()
+        self.cache.clear()
+        await self.cache.bump(1)
+        self.assertNotEqual(await self.cache.version(1), lost)
+        self.assertNotEqual(await self.cache.version(2), 0)
+
+    async def test_redis_unavailable_bypasses(self):
+        self.redis.get.side_effect = ConnectionError()
+        await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter)
+        self.assertEqual(self.load.await_count, 2)
+        self.redis.set.assert_not_awaited()
+
+    async def test_cached_not_found(self):
+        self.load.return_value = None
+        response = await self.cache.cached(1, "get_contact_by_id", {"contact_id": 1}, self.load, self.adapter)
+        self.assertIsNone(response)
+
+
+    async def test_cached_not_modified(self):
+        response = await self.cache.cached(1, "get_contacts", {"limit": 10}, self.load, self.adapter,
+                                           etag='"etag"', not_modified=True)
+        self.load.assert_not_awaited()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], '"etag"')
+
+
+class TestETag(unittest.TestCase):
+
+    def test_make_etag(self):
+        etag = make_etag(1, 5, "get_contacts", {"limit": 10, "skip": 0})
+        self.assertEqual(etag, make_etag(1, 5, "get_contacts", {"skip": 0, "limit": 10}))
+        self.assertNotEqual(etag, make_etag(1, 6, "get_contacts", {"limit": 10, "skip": 0}))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a"', '"a"'))
+        self.assertTrue(etag_matches('"b", W/"a"', '"a"'))
+        self.assertTrue(etag_matches("*", '"a"'))
+        self.assertFalse(etag_matches('"b"', '"a"'))
+        self.assertFalse(etag_matches(None, '"a"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from email import message_from_bytes
+
+from src.services.email import conf, templates, build_email, build_message
+
+
+class TestEmail(unittest.TestCase):
+
+    def test_templates_compiled_once(self):
+        template = templates.get_template("email_template.html")
+        self.assertIs(template, templates.get_template("email_template.html"))
+        self.assertIs(templates.get_template("reset_password.html"), templates.get_template("reset_password.html"))
+
+    def test_build_message_matches_template(self):
+        body = {"username": "user", "host": "http://localhost:8000/", "token": "token"}
+        message = build_message("test@test.com", "Confirm your email ", "email_template.html", body)
+        expected = conf.template_engine().get_template("email_template.html").render(**body)
+        parsed = message_from_bytes(message.as_bytes())
+        self.assertEqual(parsed["To"], "test@test.com")
+        self.assertEqual(parsed.get_content_type(), "text/html")
+        self.assertEqual(parsed.get_payload(decode=True).decode(), expected)
+
+    def test_build_email(self):
+        message = build_email("reset_password", "test@test.com", {"username": "user", "host": "http://test/"})
+        html = message.get_payload(decode=True).decode()
+        self.assertEqual(message["Subject"], "Reset password ")
+        self.assertIn("http://test/api/auth/reset/", html)
+        self.assertIn("Hi user,", html)
+
+
+if __name__ == '__main__':
+    unittest.main()
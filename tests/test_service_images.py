@@ -0,0 +1,83 @@
+import io
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from PIL import Image
+
+from src.services.images import process_image, save_avatar, InvalidImageError
+from src.services.storage import LocalStorage
+
+
+def make_image(size: tuple[int, int], mode: str = "RGB", fmt: str = "PNG") -> bytes:
+    out = io.BytesIO()
+    Image.new(mode, size, "red").save(out, fmt)
+    return out.getvalue()
+
+
+class TestProcessImage(unittest.TestCase):
+
+    def test_process_image(self):
+        results = process_image(make_image((800, 600)), [250, 64], "webp", 85)
+        for data, size in zip(results, (250, 64)):
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.size, (size, size))
+
+    def test_process_image_jpeg_drops_alpha(self):
+        (data,) = process_image(make_image((100, 100), mode="RGBA"), [50], "jpeg", 85)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual((image.format, image.mode), ("JPEG", "RGB"))
+
+    def test_process_image_large_jpeg(self):
+        (data,) = process_image(make_image((4000, 3000), fmt="JPEG"), [250], "webp", 85)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.size, (250, 250))
+
+    def test_process_image_invalid(self):
+        with self.assertRaises(InvalidImageError):
+            process_image(b"not an image", [250], "webp", 85)
+
+
+class TestSaveAvatar(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.storage = LocalStorage(workers=1, root=tmp_dir.name, base_url="/media")
+        for patcher in (patch("src.services.images.storage", self.storage),
+                        patch("src.services.images.image_executor", ThreadPoolExecutor(max_workers=1))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_save_avatar(self):
+        url = await save_avatar(make_image((300, 300)))
+        self.assertRegex(url, r"^/media/avatars/[0-9a-f]{64}/250\.webp$")
+        key = url.removeprefix("/media/")
+        self.assertTrue(await self.storage.exists(key))
+        self.assertTrue(await self.storage.exists(key.replace("250", "64")))
+
+    async def test_save_avatar_dedupe(self):
+        data = make_image((300, 300))
+        url = await save_avatar(data)
+        with patch("src.services.images.process_image") as process_mock:
+            self.assertEqual(await save_avatar(data), url)
+            process_mock.assert_not_called()
+        self.assertEqual(len(list(Path(self.storage.root, "avatars").iterdir())), 1)
+
+    async def test_save_avatar_checks_largest_only(self):
+        with patch.object(self.storage, "exists", wraps=self.storage.exists) as exists_mock:
+            url = await save_avatar(make_image((300, 300)))
+        exists_mock.assert_awaited_once_with(url.removeprefix("/media/"))
+
+    async def test_save_avatar_stores_largest_last(self):
+        with patch.object(self.storage, "save", wraps=self.storage.save) as save_mock:
+            url = await save_avatar(make_image((300, 300)))
+        self.assertEqual(save_mock.await_args.args[0], url.removeprefix("/media/"))
+        self.assertEqual(save_mock.await_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+from email.message import EmailMessage
+
+from aiosmtplib import SMTPRecipientsRefused
+from fastapi_mail import ConnectionConfig
+
+from src.services.mailer import SMTPPool, MailSender
+
+
+class DebuggingSMTPServer:
+    """
+    Local SMTP server that accepts everything and keeps the messages, for tests and manual debugging.
+
+    ``temporary_failures`` makes the next transactions fail with ``421`` and drop the connection, recipients in
+    ``rejected`` are refused with ``550``.
+    """
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.temporary_failures = 0
+        self.rejected = set()
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.write(b"220 localhost ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO"):
+                writer.write(b"250-localhost\r\n250 8BITMIME\r\n")
+            elif command.startswith("MAIL"):
+                if self.temporary_failures:
+                    self.temporary_failures -= 1
+                    writer.write(b"421 Try again later\r\n")
+                    break
+                writer.write(b"250 OK\r\n")
+            elif command.startswith("RCPT"):
+                address = command.split(":", 1)[1].strip("<> ").lower()
+                writer.write(b"550 No such user\r\n" if address in self.rejected else b"250 OK\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                self.messages.append(await reader.readuntil(b"\r\n.\r\n"))
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        await writer.drain()
+        writer.close()
+
+
+def make_message(recipient: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "sender@example.com"
+    message["To"] = recipient
+    message["Subject"] = "Confirm your email"
+    message.set_content("<p>Hi</p>", subtype="html")
+    return message
+
+
+class TestMailSender(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = DebuggingSMTPServer()
+        await self.server.start()
+        conf = ConnectionConfig(
+            MAIL_USERNAME="", MAIL_PASSWORD="", MAIL_FROM="sender@example.com", MAIL_PORT=self.server.port,
+            MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False, USE_CREDENTIALS=False, TIMEOUT=5,
+        )
+        self.pool = SMTPPool(conf, size=2)
+        self.sender = MailSender(self.pool, max_retries=2, retry_backoff=0)
+
+    async def asyncTearDown(self):
+        await self.sender.close()
+        await self.server.stop()
+
+    async def test_send_reuses_connection(self):
+        for number in range(5):
+            await self.sender.send(make_message(f"user{number}@example.com"))
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertEqual(self.server.connections, 1)
+
+    async def test_send_many_bounded_by_pool(self):
+        results = await self.sender.send_many([make_message(f"user{number}@example.com") for number in range(20)])
+        self.assertEqual(results, [None] * 20)
+        self.assertEqual(len(self.server.messages), 20)
+        self.assertLessEqual(self.server.connections, 2)
+
+    async def test_send_retries_temporary_failure(self):
+        self.server.temporary_failures = 2
+        await self.sender.send(make_message("user@example.com"))
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(self.sender.stats["retries"], 2)
+
+    async def test_send_gives_up_after_retries(self):
+        self.server.temporary_failures = 3
+        with self.assertRaises(Exception):
+            await self.sender.send(make_message("user@example.com"))
+        self.assertEqual(self.sender.stats["failed"], 1)
+
+    async def test_send_permanent_failure_not_retried(self):
+        self.server.rejected.add("missing@example.com")
+        with self.assertRaises(SMTPRecipientsRefused):
+            await self.sender.send(make_message("missing@example.com"))
+        self.assertEqual(self.sender.stats["retries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
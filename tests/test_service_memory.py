@@ -0,0 +1,81 @@
+import tracemalloc
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.memory import MemoryTracker, MemoryMiddleware
+
+
+class TestMemoryTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = MemoryTracker()
+        self.tracker.start()
+
+    def tearDown(self):
+        self.tracker.stop()
+
+    def test_status(self):
+        status = self.tracker.status()
+        self.assertTrue(status["tracing"])
+        self.assertFalse(status["baseline"])
+        self.assertGreaterEqual(status["traced_peak"], status["traced_current"])
+        self.tracker.stop()
+        self.assertFalse(self.tracker.status()["tracing"])
+
+    def test_top_against_baseline(self):
+        self.tracker.take_baseline()
+        self.allocated = [bytearray(1000) for _ in range(1000)]
+        top = self.tracker.top(limit=5)
+        self.assertLessEqual(len(top), 5)
+        self.assertIn(__file__, top[0]["traceback"][0])
+        self.assertGreaterEqual(top[0]["size_diff"], 1_000_000)
+        self.assertGreaterEqual(top[0]["count_diff"], 1000)
+
+    def test_top_without_baseline(self):
+        self.allocated = [bytearray(1000) for _ in range(1000)]
+        top = self.tracker.top(limit=3, group_by="filename")
+        self.assertEqual(top[0]["traceback"], [f"{__file__}:0"])
+        self.assertIsNone(top[0]["size_diff"])
+
+    def test_overlapping_requests_not_measured(self):
+        first = self.tracker.request_started()
+        second = self.tracker.request_started()
+        self.assertIsNone(second)
+        self.tracker.request_finished("GET", "/b", second)
+        self.tracker.request_finished("GET", "/a", first)
+        self.assertEqual(self.tracker.route_stats(), [])
+        self.assertEqual(self.tracker.status()["overlapped_requests"], 2)
+
+
+class TestMemoryMiddleware(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = MemoryTracker()
+        app = FastAPI()
+        app.add_middleware(MemoryMiddleware, tracker=self.tracker)
+
+        @app.get("/items/{count}")
+        async def get_items(count: int):
+            return {"size": len([bytearray(1000) for _ in range(count)])}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            self.tracker.stop()
+
+    def test_not_tracing(self):
+        self.client.get("/items/10")
+        self.assertEqual(self.tracker.route_stats(), [])
+
+    def test_route_peak(self):
+        self.tracker.start()
+        self.client.get("/items/10")
+        self.client.get("/items/2000")
+        stats = self.tracker.route_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual((stats[0]["method"], stats[0]["route"], stats[0]["requests"]), ("GET", "/items/{count}", 2))
+        self.assertGreaterEqual(stats[0]["peak_max"], 2_000_000)
+        self.assertLess(stats[0]["retained_max"], stats[0]["peak_max"])
@@ -0,0 +1,91 @@
+import unittest
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.metrics import (Histogram, RequestMetrics, MetricsMiddleware, format_histogram, format_metric,
+                                  format_labels)
+
+
+class TestRequestMetrics(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.metrics = RequestMetrics()
+
+    def test_observe_request(self):
+        self.metrics.observe_request("GET", "/items/{id}", 200, 0.02, 150)
+        self.metrics.observe_request("GET", "/items/{id}", 200, 0.2, 50)
+        self.metrics.observe_request("GET", "/items/{id}", 404, 0.001, 20)
+        self.assertEqual(self.metrics.requests[("GET", "/items/{id}", "200")], 2)
+        self.assertEqual(self.metrics.requests[("GET", "/items/{id}", "404")], 1)
+        snapshot = self.metrics.durations[("GET", "/items/{id}", "200")].snapshot()
+        self.assertEqual(snapshot["buckets"]["0.025"], 1)
+        self.assertEqual(snapshot["count"], 2)
+        self.assertEqual(self.metrics.sizes[("GET", "/items/{id}")].snapshot()["sum"], 220)
+
+    async def test_timed_coroutine(self):
+        @self.metrics.timed("dependency")
+        async def dependency(value: int):
+            return value * 2
+
+        self.assertEqual(await dependency(2), 4)
+        self.assertEqual(self.metrics.dependencies["dependency"].snapshot()["count"], 1)
+
+    async def test_timed_generator(self):
+        closed = []
+
+        @self.metrics.timed("generator")
+        async def dependency():
+            yield 1
+            closed.append(True)
+
+        generator = dependency()
+        self.assertEqual(await anext(generator), 1)
+        self.assertEqual(self.metrics.dependencies["generator"].snapshot()["count"], 1)
+        with self.assertRaises(StopAsyncIteration):
+            await anext(generator)
+        self.assertEqual(closed, [True])
+
+    def test_middleware(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, metrics=self.metrics)
+
+        @self.metrics.timed("number")
+        async def number(value: int = 1):
+            return value
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int, value: int = Depends(number)):
+            return {"id": item_id, "value": value}
+
+        client = TestClient(app)
+        self.assertEqual(client.get("/items/1?value=3").json(), {"id": 1, "value": 3})
+        client.get("/items/2")
+        client.get("/items/x")
+        client.get("/missing")
+        self.assertEqual(self.metrics.requests[("GET", "/items/{item_id}", "200")], 2)
+        self.assertEqual(self.metrics.requests[("GET", "/items/{item_id}", "422")], 1)
+        self.assertEqual(self.metrics.requests[("GET", "<unmatched>", "404")], 1)
+        self.assertEqual(self.metrics.dependencies["number"].snapshot()["count"], 3)
+        self.assertEqual(self.metrics.in_progress["GET"], 0)
+
+
+class TestFormat(unittest.TestCase):
+
+    def test_format_labels(self):
+        self.assertEqual(format_labels({}), "")
+        self.assertEqual(format_labels({"route": '/a"b\\'}), '{route="/a\\"b\\\\"}')
+
+    def test_format_metric(self):
+        lines = format_metric("requests_total", "counter", "Requests.", [({"status": "200"}, 3)])
+        self.assertEqual(lines, ["# HELP requests_total Requests.", "# TYPE requests_total counter",
+                                 'requests_total{status="200"} 3'])
+
+    def test_format_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        histogram.observe(0.5)
+        lines = format_histogram("duration_seconds", "Duration.", [({"route": "/"}, histogram)])
+        self.assertIn('duration_seconds_bucket{route="/",le="0.1"} 0', lines)
+        self.assertIn('duration_seconds_bucket{route="/",le="+Inf"} 1', lines)
+        self.assertIn('duration_seconds_sum{route="/"} 0.5', lines)
+        self.assertIn('duration_seconds_count{route="/"} 1', lines)
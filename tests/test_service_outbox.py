@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiosmtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import EmailOutbox
+from src.services.outbox import process_batch, run_worker
+
+
+class TestOutbox(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.session = AsyncMock(spec=AsyncSession)
+        self.sender = AsyncMock()
+        self.emails = [
+            EmailOutbox(id=number, kind="confirm_email", recipient=f"user{number}@example.com",
+                        payload={"username": "user", "host": "http://test/"}, attempts=0)
+            for number in range(1, 4)
+        ]
+        patcher = patch("src.services.outbox.repository_outbox")
+        self.repository = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.repository.claim_emails = AsyncMock(return_value=self.emails)
+        self.repository.record_attempts = AsyncMock()
+
+    async def test_process_batch(self):
+        self.sender.send_many.return_value = [None, SMTPServerDisconnected("closed"), SMTPRecipientsRefused([])]
+        result = await process_batch(self.session, self.sender)
+        self.assertEqual(result, 3)
+        messages = self.sender.send_many.await_args.args[0]
+        self.assertEqual([message["To"] for message in messages], [email.recipient for email in self.emails])
+        (sent, retried, refused), _ = self.repository.record_attempts.await_args.args
+        self.assertEqual(sent, (self.emails[0], None, None))
+        self.assertEqual(retried[1], "closed")
+        self.assertIsNotNone(retried[2])
+        self.assertIsNotNone(refused[1])
+        self.assertIsNone(refused[2])
+
+    async def test_process_batch_gives_up(self):
+        self.emails[0].attempts = 4
+        self.repository.claim_emails.return_value = self.emails[:1]
+        self.sender.send_many.return_value = [SMTPServerDisconnected("closed")]
+        await process_batch(self.session, self.sender)
+        (attempt,), _ = self.repository.record_attempts.await_args.args
+        self.assertIsNone(attempt[2])
+
+    async def test_process_batch_unknown_kind(self):
+        self.emails[0].kind = "unknown"
+        self.sender.send_many.return_value = [None, None]
+        await process_batch(self.session, self.sender)
+        self.assertEqual(len(self.sender.send_many.await_args.args[0]), 2)
+        (failed, sent, _), _ = self.repository.record_attempts.await_args.args
+        self.assertIsNotNone(failed[1])
+        self.assertIsNone(sent[1])
+
+    async def test_process_batch_empty(self):
+        self.repository.claim_emails.return_value = []
+        result = await process_batch(self.session, self.sender)
+        self.assertEqual(result, 0)
+        self.sender.send_many.assert_not_awaited()
+        self.repository.record_attempts.assert_not_awaited()
+
+
+class TestRunWorker(unittest.IsolatedAsyncioTestCase):
+
+    async def test_run_worker_survives_failed_batch(self):
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__ = AsyncMock(return_value=AsyncMock(spec=AsyncSession))
+        session_factory.return_value.__aexit__ = AsyncMock(return_value=False)
+        sender = AsyncMock()
+        outcomes = [OperationalError("SELECT", {}, Exception("connection lost")), 3, asyncio.CancelledError()]
+        with patch("src.services.outbox.process_batch", AsyncMock(side_effect=outcomes)) as process_mock, \
+                patch("src.services.outbox.settings.outbox_poll_interval", 0), \
+                self.assertLogs("src.services.outbox", "ERROR") as logs:
+            with self.assertRaises(asyncio.CancelledError):
+                await run_worker(session_factory, sender)
+        self.assertEqual(process_mock.await_count, 3)
+        self.assertIn("connection lost", logs.output[0])
+        sender.close.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import cProfile
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.conf.config import settings
+from src.services.auth import auth_service
+from src.services.profiling import ProfileStore, ProfilingMiddleware, is_admin_token
+
+
+class TestProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(self.tmp.name, max_profiles=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        profile.enable()
+        sorted(range(100))
+        profile.disable()
+        return profile
+
+    def test_make_name(self):
+        name = self.store.make_name("GET", "/api/contacts/1")
+        self.assertRegex(name, r"^\d{8}T\d{6}-get-api_contacts_1-[0-9a-f]{8}\.pstats$")
+
+    def test_save_and_prune(self):
+        names = [f"2024010{number}T000000-get-root-0000000{number}.pstats" for number in range(3)]
+        for number, name in enumerate(names):
+            self.store.save(self.make_profile(), name)
+            os.utime(self.store.directory / name, (number, number))
+        self.assertEqual([profile["name"] for profile in self.store.list()], names[:0:-1])
+        self.assertIsNone(self.store.path(names[0]))
+        stats = pstats.Stats(str(self.store.path(names[2])))
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_path_rejects_other_files(self):
+        self.assertEqual(self.store.list(), [])
+        self.assertIsNone(self.store.path("../config.pstats"))
+        self.assertIsNone(self.store.path("missing.pstats"))
+
+
+class TestProfilingMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ProfileStore(self.tmp.name, max_profiles=10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_client(self, sample_rate: float) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, store=self.store, sample_rate=sample_rate)
+
+        @app.get("/")
+        async def root():
+            return {"message": "ok"}
+
+        return TestClient(app)
+
+    async def test_is_admin_token(self):
+        admin = await auth_service.create_access_token({"sub": "admin@test.com"})
+        refresh = await auth_service.create_refresh_token({"sub": "admin@test.com"})
+        user = await auth_service.create_access_token({"sub": "user@test.com"})
+        with patch.object(settings, "admin_emails", ["admin@test.com"]):
+            self.assertTrue(is_admin_token(f"Bearer {admin}"))
+            self.assertFalse(is_admin_token(f"Bearer {refresh}"))
+            self.assertFalse(is_admin_token(f"Bearer {user}"))
+            self.assertFalse(is_admin_token("Bearer invalid"))
+            self.assertFalse(is_admin_token(""))
+
+    async def test_profile_on_request(self):
+        client = self.make_client(sample_rate=0)
+        token = await auth_service.create_access_token({"sub": "admin@test.com"})
+        with patch.object(settings, "admin_emails", ["admin@test.com"]):
+            response = client.get("/")
+            self.assertNotIn("X-Profile-Id", response.headers)
+            response = client.get("/", headers={"X-Profile": "1"})
+            self.assertNotIn("X-Profile-Id", response.headers)
+            response = client.get("/", headers={"X-Profile": "1", "Authorization": f"Bearer {token}"})
+        self.assertEqual(response.json(), {"message": "ok"})
+        self.assertIsNotNone(self.store.path(response.headers["X-Profile-Id"]))
+        self.assertEqual(len(self.store.list()), 1)
+
+    async def test_profile_sampled(self):
+        client = self.make_client(sample_rate=1)
+        response = client.get("/")
+        self.assertIsNotNone(self.store.path(response.headers["X-Profile-Id"]))
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.exceptions import ConnectionError
+
+from src.services.rate_limit import RateLimitStore
+
+
+class TestRateLimitStore(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.store = {}
+        self.redis = AsyncMock()
+        self.redis.incrby.side_effect = self.incrby
+        self.limiter = self.make_limiter()
+        self.now = 1000.0
+        patcher = patch("src.services.rate_limit.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_limiter(self):
+        return RateLimitStore(self.redis, limits={"read": (2, 10)}, sync_interval=1, maxsize=100)
+
+    def incrby(self, key, amount):
+        self.store[key] = self.store.get(key, 0) + amount
+        return self.store[key]
+
+    async def settle(self):
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    async def test_hit_limits(self):
+        self.assertEqual(self.limiter.hit("read", "get_contacts", 1), 0)
+        self.assertEqual(self.limiter.hit("read", "get_contacts", 1), 0)
+        self.assertAlmostEqual(self.limiter.hit("read", "get_contacts", 1), 5)
+        self.assertEqual(self.limiter.hit("read", "get_contacts", 2), 0)
+        self.assertEqual(self.limiter.hit("read", "search_contacts", 1), 0)
+        self.assertEqual(self.limiter.stats["limited"], 1)
+
+    async def test_hit_refills(self):
+        self.limiter.hit("read", "get_contacts", 1)
+        self.limiter.hit("read", "get_contacts", 1)
+        self.now += 5
+        self.assertEqual(self.limiter.hit("read", "get_contacts", 1), 0)
+        self.assertGreater(self.limiter.hit("read", "get_contacts", 1), 0)
+
+    async def test_sync_shares_consumption(self):
+        other = self.make_limiter()
+        self.limiter.hit("read", "get_contacts", 1)
+        await self.settle()
+        other.hit("read", "get_contacts", 1)
+        await self.settle()
+        self.assertEqual(self.store["rate:read:get_contacts:1"], 2)
+        # The other worker saw the first request, so its bucket is empty
+        self.assertGreater(other.hit("read", "get_contacts", 1), 0)
+        self.redis.expire.assert_awaited_once()
+
+    async def test_sync_at_most_once_per_interval(self):
+        self.limiter.hit("read", "get_contacts", 1)
+        await self.settle()
+        self.limiter.hit("read", "get_contacts", 1)
+        await self.settle()
+        self.assertEqual(self.redis.incrby.await_count, 1)
+        self.now += 1
+        self.limiter.hit("read", "get_contacts", 1)
+        await self.settle()
+        self.assertEqual(self.store["rate:read:get_contacts:1"], 2)
+
+    async def test_redis_unavailable(self):
+        self.redis.incrby.side_effect = ConnectionError()
+        self.limiter.hit("read", "get_contacts", 1)
+        await self.settle()
+        self.limiter.hit("read", "get_contacts", 1)
+        self.assertGreater(self.limiter.hit("read", "get_contacts", 1), 0)
+        self.assertEqual(self.limiter.stats["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.services.storage import LocalStorage, CloudinaryStorage
+
+
+class TestLocalStorage(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = Path(tmp_dir.name)
+        self.storage = LocalStorage(workers=1, root=self.root / "media", base_url="/media/")
+
+    async def test_save(self):
+        url = await self.storage.save("contact_photo/test@test.com", io.BytesIO(b"avatar"))
+        self.assertEqual(url, "/media/contact_photo/test@test.com")
+        self.assertEqual((self.root / "media" / "contact_photo" / "test@test.com").read_bytes(), b"avatar")
+
+    async def test_save_overwrites(self):
+        await self.storage.save("avatar", io.BytesIO(b"old"))
+        await self.storage.save("avatar", io.BytesIO(b"new"))
+        self.assertEqual((self.root / "media" / "avatar").read_bytes(), b"new")
+        self.assertEqual([path.name for path in (self.root / "media").iterdir()], ["avatar"])
+
+    async def test_exists(self):
+        self.assertFalse(await self.storage.exists("avatar"))
+        await self.storage.save("avatar", io.BytesIO(b"avatar"))
+        self.assertTrue(await self.storage.exists("avatar"))
+        self.assertEqual(self.storage.url("avatar"), "/media/avatar")
+
+    async def test_save_concurrently(self):
+        storage = LocalStorage(workers=8, root=self.root / "media", base_url="/media/")
+        await asyncio.gather(*(storage.save("avatar", io.BytesIO(bytes([number]) * 100_000)) for number in range(8)))
+        data = (self.root / "media" / "avatar").read_bytes()
+        self.assertEqual(len(set(data)), 1)
+        self.assertEqual(len(data), 100_000)
+        self.assertEqual([path.name for path in (self.root / "media").iterdir()], ["avatar"])
+
+    async def test_save_outside_root(self):
+        with self.assertRaises(ValueError):
+            await self.storage.save("../avatar", io.BytesIO(b"avatar"))
+
+    async def test_save_off_event_loop(self):
+        threads = []
+        self.storage._save = lambda key, file: threads.append(threading.current_thread()) or key
+        await self.storage.save("avatar", io.BytesIO(b"avatar"))
+        self.assertIsNot(threads[0], threading.main_thread())
+
+
+class TestCloudinaryStorage(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.storage = CloudinaryStorage(workers=1)
+
+    async def test_exists_without_admin_api(self):
+        with patch("cloudinary.api.resource") as resource_mock, \
+                patch("cloudinary.uploader.upload", return_value={"version": 1}) as upload_mock:
+            self.assertFalse(await self.storage.exists("avatars/abc/250.webp"))
+            url = await self.storage.save("avatars/abc/250.webp", io.BytesIO(b"avatar"))
+            self.assertTrue(await self.storage.exists("avatars/abc/250.webp"))
+            self.assertFalse(await self.storage.exists("avatars/abc/64.webp"))
+        resource_mock.assert_not_called()
+        self.assertEqual(upload_mock.call_args.kwargs["public_id"], "avatars/abc/250")
+        self.assertIn("avatars/abc/250.webp", url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+import asyncio
+
+from src.services.outbox import run_worker
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())